@@ -1,21 +1,30 @@
+import time
+rerun_started = time.perf_counter()  # Per-rerun overhead is measured from the top of the script
+
 import streamlit as st
-import requests
+import hmac
 import json
-import os
-from dotenv import load_dotenv
-
-# Load environment variables for local development
-load_dotenv()
+import uuid
+from bootstrap import get_config, get_stylesheet, record_rerun, warm_up
+from chat_history import Message, render_history
+from conversation import ConversationContext
+from response_cache import get_response_cache
+from llm_client import api_status
+from quiz_bank import get_quiz_bank
+from pipeline import answer_question
+from progress_store import PAGE_SIZE, get_progress_store
+from preprocess import answer_language, local_reply, preprocess
+from prompts import GRADES, LANGUAGES, SUBJECTS
+from jobs import get_job_queue, JobLimitError
+from metrics import get_metrics, render_admin_page
+from router import get_router
+from coordinator import get_coordinator
 
-# Configuration - Use Streamlit secrets for production, .env for local
-try:
-    # Try to get API key from Streamlit secrets (for Streamlit Cloud)
-    API_KEY = st.secrets["OPENROUTER_API_KEY"]
-    MODEL = st.secrets.get("MODEL", "gpt-4o-mini")
-except:
-    # Fallback to .env file for local development
-    API_KEY = os.getenv("OPENROUTER_API_KEY")
-    MODEL = os.getenv("MODEL", "gpt-4o-mini")
+# Resolved once per process: Streamlit secrets in production, .env for local development
+config = get_config()
+API_KEY = config["api_key"]
+MODEL = config["model"]
+ADMIN_TOKEN = config["admin_token"]
 
 # Validate API key
 if not API_KEY or API_KEY == "your_openrouter_api_key_here":
@@ -30,27 +39,8 @@ if not API_KEY or API_KEY == "your_openrouter_api_key_here":
 
     **Note:** Never commit API keys to your repository!
     """)
-    st.info(f"Debug: API_KEY loaded: {bool(API_KEY)}, Length: {len(API_KEY) if API_KEY else 0}")
     st.stop()  # Stop execution until API key is configured
 
-# System Prompt
-SYSTEM_PROMPT = """You are LearningBuddy, a friendly, bilingual AI tutor for children in Grades 1–12.
-
-Your role is to:
-1. Provide clear, age-appropriate explanations in simple language
-2. Use emojis and visual descriptions to make learning engaging
-3. Be patient, encouraging, and supportive
-4. Adapt content to the student's grade level and language
-5. Maintain a positive and motivating tone
-
-For quizzes:
-- Generate 10 relevant questions with 4 options each
-- Include a mix of difficulty levels
-- Provide clear feedback for each answer
-- Be encouraging regardless of the score
-
-Format your responses with clear sections and use markdown for better readability."""
-
 # Set up the page
 st.set_page_config(
     page_title="LearningBuddy AI Chatbot",
@@ -58,69 +48,68 @@ st.set_page_config(
     layout="centered"
 )
 
-def display_chat():
-    """Display chat messages to avoid full script reruns."""
-    for message in st.session_state.messages:
-        if message["role"] in ["user", "assistant"]:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+# Start building the shared clients and indexes while the first page draws
+warm_up()
+
+# Hidden metrics page for maintainers: ?admin=<ADMIN_TOKEN>
+if ADMIN_TOKEN and hmac.compare_digest(st.query_params.get("admin", "").encode(), ADMIN_TOKEN.encode()):
+    render_admin_page({
+        "Answer cache": lambda: get_response_cache().stats(),
+        "Models": lambda: get_router().stats(),
+        "Request coordinator": lambda: get_coordinator().stats,
+        "Progress store": lambda: get_progress_store().stats(),
+        "API health": api_status,
+    })
+    st.stop()
 
-# Custom CSS for better mobile experience and performance
-st.markdown("""
-    <style>
-    @media (max-width: 768px) {
-        .stTextInput, .stTextArea, .stButton, .stSelectbox {
-            font-size: 16px !important;
-        }
-        .stMarkdown {
-            font-size: 16px !important;
-        }
-        .stButton > button {
-            width: 100% !important;
-            margin: 5px 0 !important;
-        }
-    }
-    .stButton > button {
-        background-color: #4CAF50 !important;
-        color: white !important;
-        border-radius: 8px;  /* Slightly reduced for better performance */
-        padding: 10px 20px;
-    }
-    .stTextArea textarea {
-        min-height: 100px;
-    }
-    .quiz-question {
-        background-color: #f0f2f6;
-        padding: 15px;
-        border-radius: 8px;  /* Reduced for better performance */
-        margin-bottom: 15px;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Styles from style.css, read once per process
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
-# Initialize session state
+# Initialize session state; a refresh (or a restarted server) restores the session named in the URL
+progress = get_progress_store()
 if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "assistant", 
-         "content": "👋 Hello! I'm LearningBuddy. Which language would you like to learn in? / नमस्ते! आप किस भाषा में सीखना चाहेंगे?"
-        }
-    ]
-    st.session_state.language = "English"
-    st.session_state.subject = "Science"
-    st.session_state.grade = 6
+    restored = progress.load_session(st.query_params.get("session"))
+    if restored:
+        st.session_state.session_id = restored["id"]
+        st.session_state.student = restored["student"]
+        # Only the message count is read now; the history loads pages as they are shown
+        st.session_state.messages = progress.history(restored["id"], restored["messages"])
+        st.session_state.language = restored["language"] or "English"
+        st.session_state.subject = restored["subject"] or "Science"
+        st.session_state.grade = restored["grade"] or 6
+        # Context for follow-ups comes from the last page only; older turns are never read back
+        st.session_state.conversation = ConversationContext(folded=max(0, restored["messages"] - PAGE_SIZE))
+    else:
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.student = st.query_params.get("student") or st.session_state.session_id
+        st.session_state.messages = progress.history(st.session_state.session_id)
+        st.session_state.messages.append(
+            Message("assistant", "👋 Hello! I'm LearningBuddy. Which language would you like to learn in? / नमस्ते! आप किस भाषा में सीखना चाहेंगे?")
+        )
+        st.session_state.language = "English"
+        st.session_state.subject = "Science"
+        st.session_state.grade = 6
+        st.session_state.conversation = ConversationContext()
+    st.query_params["session"] = st.session_state.session_id
+    st.session_state.saved_settings = None
     st.session_state.waiting_for_video_confirmation = False
     st.session_state.waiting_for_quiz_confirmation = False
     st.session_state.quiz_questions = []
     st.session_state.current_question = 0
     st.session_state.quiz_score = 0
     st.session_state.quiz_started = False
+    st.session_state.quiz_feedback = None
+    st.session_state.quiz_topic = None
+    st.session_state.quiz_attempt = None
+    st.session_state.pending_jobs = []
+    st.session_state.notices = []
 
 # Sidebar for settings
 with st.sidebar:
     st.title("⚙️ Settings")
     
     # Language selection
-    language_options = ["English", "हिंदी (Hindi)"]
+    language_options = LANGUAGES
     st.session_state.language = st.radio(
         "Choose Language / भाषा चुनें:",
         language_options,
@@ -128,7 +117,7 @@ with st.sidebar:
     )
     
     # Subject selection
-    subject_list = ["Science", "Maths", "English", "EVS", "Hindi"]
+    subject_list = SUBJECTS
     st.session_state.subject = st.selectbox(
         "Select Subject / विषय चुनें:",
         subject_list,
@@ -145,259 +134,239 @@ with st.sidebar:
 
     st.session_state.grade = st.selectbox(
         "Select Class / कक्षा चुनें:",
-        list(range(1, 13)),
+        GRADES,
         index=grade_index
     )
 
+    settings = (st.session_state.language, st.session_state.subject, st.session_state.grade)
+    if settings != st.session_state.saved_settings:
+        progress.save_session(st.session_state.session_id, st.session_state.student, *settings)
+        st.session_state.saved_settings = settings
+    
+    # Connection status from the shared background health check
+    status = api_status()
+    if status["reachable"] is False:
+        st.caption("🔴 Tutor service unreachable - offline answers only")
+    elif status["reachable"]:
+        st.caption(f"🟢 Tutor service online ({status['latency'] * 1000:.0f} ms)")
+    
+    # Shared answer cache hit/miss stats
+    cache_stats = get_response_cache().stats()
+    st.caption(f"⚡ Answer cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
+
 # Main chat interface
 st.title("🎓 LearningBuddy")
 st.caption("Your friendly AI study companion for Grades 1-12 / कक्षा 1-12 के लिए आपका दोस्ताना AI साथी")
 
-# Display chat messages using the function to avoid reruns
-display_chat()
+# Recent turns in full, older ones collapsed, so reruns stay cheap in long sessions
+with get_metrics().time("render"):
+    render_history(st.session_state.messages)
 
-def get_offline_response(question, subject, grade, language):
-    """Provide basic offline responses when API is not accessible."""
-    responses = {
-        "photosynthesis": {
-            "English": "Photosynthesis is how plants make their food using sunlight! 🌱☀️ Plants take in carbon dioxide from the air and water from the soil, and use sunlight to turn them into glucose (sugar) and oxygen. The green pigment chlorophyll helps capture sunlight. This process happens in the leaves of plants.",
-            "हिंदी": "प्रकाश संश्लेषण पौधों का भोजन बनाने का तरीका है जो सूरज की रोशनी का उपयोग करता है! 🌱☀️ पौधे हवा से कार्बन डाइऑक्साइड और मिट्टी से पानी लेते हैं, और सूरज की रोशनी का उपयोग करके उन्हें ग्लूकोज (चीनी) और ऑक्सीजन में बदल देते हैं। हरी वर्णक क्लोरोफिल सूरज की रोशनी को पकड़ने में मदद करता है। यह प्रक्रिया पौधों की पत्तियों में होती है।"
-        },
-        "science": {
-            "English": "Science helps us understand how the world works! 🔬 It includes biology (study of living things), chemistry (study of matter), and physics (study of energy and forces). Scientists use experiments and observations to learn new things.",
-            "हिंदी": "विज्ञान हमें दुनिया कैसे काम करती है यह समझने में मदद करता है! 🔬 इसमें जीव विज्ञान (जीवित चीजों का अध्ययन), रसायन विज्ञान (पदार्थ का अध्ययन), और भौतिकी (ऊर्जा और बलों का अध्ययन) शामिल हैं। वैज्ञानिक नए चीजें सीखने के लिए प्रयोग और अवलोकन का उपयोग करते हैं।"
-        }
-    }
-    
-    # Simple keyword matching for basic responses
-    question_lower = question.lower()
-    
-    if "photosynthesis" in question_lower or "प्रकाश संश्लेषण" in question_lower:
-        topic = "photosynthesis"
-    elif any(word in question_lower for word in ["science", "विज्ञान", "what is science", "विज्ञान क्या है"]):
-        topic = "science"
+# Warnings and toasts left by answers that finished in the background
+for kind, message in st.session_state.notices:
+    getattr(st, kind)(message)
+st.session_state.notices = []
+
+def reset_quiz(questions=None, topic=None):
+    """Replace the quiz with a new set of questions (or none), starting from question 1 with no score."""
+    st.session_state.quiz_questions = questions or []
+    st.session_state.quiz_topic = topic
+    st.session_state.current_question = 0
+    st.session_state.quiz_score = 0
+    st.session_state.quiz_started = False
+    st.session_state.quiz_feedback = None
+
+def finish_job(job):
+    """Move a finished answer job's result into the chat and quiz state."""
+    if job.status == "done":
+        result = job.result
+        st.session_state.messages.append(Message("assistant", result["text"]))
+        st.session_state.notices.extend(result["notices"])
+        if result["ttft"] is not None:
+            st.session_state.last_ttft = result["ttft"]
+        if result["quiz_questions"]:
+            reset_quiz(result["quiz_questions"], result["topic"])
+            st.session_state.waiting_for_quiz_confirmation = True
+        # If we have video suggestions, ask if they want to watch
+        if any(word in result["text"].lower() for word in ['youtube', 'video', 'watch']):
+            st.session_state.waiting_for_video_confirmation = True
+    elif job.status == "failed":
+        error_msg = f"❌ Unexpected Error: {str(job.error)}"
+        st.session_state.messages.append(Message("assistant", error_msg))
+        st.session_state.notices.append(("error", error_msg))
+
+@st.fragment(run_every=0.5)
+def show_pending_answers():
+    """Poll background answer jobs, so the page stays usable while answers are generated."""
+    job_queue = get_job_queue()
+    for job_id in list(st.session_state.pending_jobs):
+        job = job_queue.get(job_id)
+        if job is None or job.finished:
+            if job is not None:
+                finish_job(job)
+                job_queue.forget(job_id)
+            st.session_state.pending_jobs.remove(job_id)
+            st.rerun()  # Redraw the whole page with the new message and quiz prompt
+        
+        with st.chat_message("assistant"):
+            explanation = job.progress.get("explanation")
+            ahead = job_queue.position(job_id)
+            if ahead is not None:
+                # Every worker is busy with other students' questions
+                st.markdown(f"⏳ Lots of students are asking right now - you're in the queue"
+                            f"{f' ({ahead} ahead of you)' if ahead else ', next up'}. / आप कतार में हैं।")
+            else:
+                st.markdown(explanation + "▌" if explanation else "🤖 Thinking... please wait")
+            if job.progress.get("video"):
+                st.markdown(job.progress["video"])
+            if job.progress.get("quiz_count"):
+                st.caption(f"📝 Quiz ready: {job.progress['quiz_count']} questions")
+            if st.button("Cancel / रद्द करें", key=f"cancel-{job_id}"):
+                job_queue.cancel(job_id)
+                st.session_state.pending_jobs.remove(job_id)
+                st.rerun()
+
+def answer_quiz(choice):
+    """Grade the current quiz question; runs as a button callback (before the fragment redraws) or for a typed answer."""
+    question = st.session_state.quiz_questions[st.session_state.current_question]
+    is_correct = choice == (question.get('answer') or '').lower()
+    if question.get('id'):
+        get_quiz_bank().record_outcome(question['id'], is_correct)
+    # Queued, not written - the click never waits on disk
+    progress.record_answer(st.session_state.quiz_attempt, st.session_state.current_question,
+                           question.get('id'), choice, is_correct)
+    # Check answer
+    if is_correct:
+        st.session_state.quiz_score += 1
+        st.session_state.quiz_feedback = ("success", "✅ Correct!")
     else:
-        topic = None
+        st.session_state.quiz_feedback = ("error", f"❌ Incorrect. The correct answer is {question.get('answer') or 'unknown'}.")
     
-    if topic and topic in responses:
-        return responses[topic].get(language, responses[topic]["English"])
-    else:
-        return f"I'm currently in offline mode and can't provide detailed answers. Please try again when you have internet connection. For now, I can suggest watching educational videos on YouTube about your topic: '{question}'"
+    # Move to next question or show results
+    st.session_state.current_question += 1
+    if st.session_state.current_question >= len(st.session_state.quiz_questions):
+        # Calculate score
+        score = (st.session_state.quiz_score / len(st.session_state.quiz_questions)) * 100
+        
+        # Provide feedback based on score
+        if score < 50:
+            feedback = "You might want to review the material and try again. Would you like to see the explanation again?"
+        elif score < 90:
+            feedback = f"Good job! You scored {score:.0f}%. Would you like to try a similar quiz to improve further?"
+        else:
+            feedback = f"Excellent work! You scored {score:.0f}%. Would you like to try a more challenging quiz?"
+        
+        progress.finish_attempt(st.session_state.quiz_attempt, score)
+        st.session_state.messages.append(Message(
+            "assistant", f"Quiz complete! Your score: {score:.0f}%. {feedback}"
+        ))
+        st.session_state.quiz_started = False
+        st.session_state.quiz_feedback = None
 
-def parse_quiz_response(response_text):
-    """Parse the quiz questions and answers from the AI response."""
-    questions = []
-    current_question = None
-    
-    lines = response_text.split('\n')
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if line.startswith(('Q', 'Question')) and ('.' in line or ':' in line):
-            if current_question:
-                questions.append(current_question)
-            question_text = line.split(':', 1)[-1].split('.', 1)[-1].strip()
-            current_question = {
-                'question': question_text,
-                'options': [],
-                'answer': None
-            }
-        elif current_question and line and line[0].lower() in 'abcd' and (')' in line or '.' in line or ':' in line):
-            option_text = line.split(')', 1)[-1].split(':', 1)[-1].split('.', 1)[-1].strip()
-            current_question['options'].append(option_text)
-            if 'correct' in line.lower() or 'answer' in line.lower():
-                current_question['answer'] = line[0].lower()
-        i += 1
-    
-    if current_question and current_question['options']:
-        questions.append(current_question)
-    
-    return questions[:10]  # Return max 10 questions
+def exit_quiz():
+    st.session_state.quiz_started = False
+    st.session_state.waiting_for_quiz_confirmation = False
+    st.session_state.quiz_feedback = None
 
 # Handle chat input and responses
 if prompt := st.chat_input("Type your question here... / अपना प्रश्न यहाँ टाइप करें..."):
-    # Reset quiz state for new questions
-    if not st.session_state.waiting_for_video_confirmation and not st.session_state.waiting_for_quiz_confirmation:
-        st.session_state.quiz_questions = []
-        st.session_state.current_question = 0
-        st.session_state.quiz_score = 0
-        st.session_state.quiz_started = False
-    
+    # Local first pass: normalized text, detected language and intent, in microseconds
+    options = None
+    if st.session_state.quiz_started and st.session_state.current_question < len(st.session_state.quiz_questions):
+        options = st.session_state.quiz_questions[st.session_state.current_question].get("options")
+    query = preprocess(prompt, options)
+    language = answer_language(query, st.session_state.language)
+
     # Handle quiz answers
-    if st.session_state.waiting_for_quiz_confirmation and prompt.lower() in ['yes', 'y', 'haan', 'हाँ', 'हां']:
+    if query.intent == "quiz_answer" and st.session_state.quiz_started:
+        answer_quiz(query.choice)  # Typed instead of clicked
+        prompt = ""
+    elif query.intent == "yes" and st.session_state.waiting_for_quiz_confirmation:
+        reset_quiz(st.session_state.quiz_questions, st.session_state.quiz_topic)
         st.session_state.quiz_started = True
         st.session_state.waiting_for_quiz_confirmation = False
+        st.session_state.quiz_attempt = uuid.uuid4().hex
+        progress.start_attempt(
+            st.session_state.quiz_attempt, st.session_state.session_id, st.session_state.student,
+            st.session_state.subject, st.session_state.grade, st.session_state.language,
+            st.session_state.quiz_topic, len(st.session_state.quiz_questions)
+        )
         prompt = ""  # Clear the prompt to avoid processing as a new question
-    
-    # Process regular questions
-    if prompt and prompt.strip():
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        
-        # Display user message
+    elif query.intent == "question":
+        # A new question ends the old quiz; its answer brings a quiz of its own
+        reset_quiz()
+        st.session_state.waiting_for_quiz_confirmation = False
+
+    if prompt and query.intent != "question":
+        # Greetings, thanks, yes/no and empty input are answered here, with no API call
+        if query.intent == "no":
+            st.session_state.waiting_for_quiz_confirmation = False
+            st.session_state.waiting_for_video_confirmation = False
+        reply = local_reply(query.intent, language)
+        get_metrics().incr("local_replies", intent=query.intent)
+        st.session_state.messages.append(Message("user", prompt))
+        st.session_state.messages.append(Message("assistant", reply))
         with st.chat_message("user"):
             st.markdown(prompt)
-        
-        # Show typing indicator
         with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            message_placeholder.markdown("Thinking...")
-        
-        try:
-            # Simple test to see if API works
-            try:
-                test_response = requests.get("https://openrouter.ai/api/v1/models", timeout=5)
-                st.info("Debug: OpenRouter API is reachable")
-            except:
-                st.error("Debug: Cannot reach OpenRouter API - check your internet or API key")
-            headers = {
-                "Authorization": f"Bearer {API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            # Build context based on the current state
-            context = f"""Language: {st.session_state.language}
-Subject: {st.session_state.subject}
-Grade: {st.session_state.grade}
-
-Student's question: {prompt}
+            st.markdown(reply)
 
-Please provide:
-1. A clear, age-appropriate explanation in {st.session_state.language}
-2. A relevant YouTube video link (if applicable)
-3. A 10-question multiple choice quiz in this format:
-   Q1. [Question]?
-   a) Option 1
-   b) Option 2
-   c) Option 3
-   d) Option 4
-   Answer: [correct_letter]
-   
-   Continue for 10 questions.
-
-Format your response with clear sections for each part."""
-            
-            payload = {
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": context}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 400  # Reduced for faster responses and better stability
-            }
-            
-            # Make the API call with optimized timeout and response size
-            with st.spinner("🤖 Thinking... please wait"):
-                response = requests.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=20  # Reduced timeout for better responsiveness
-                )
-                response.raise_for_status()
-            
-            # Process the response
-            data = response.json()
-            assistant_response = data["choices"][0]["message"]["content"]
-            
-            # Debug: Show response details
-            st.info(f"Debug: API call successful, response length: {len(assistant_response)} characters")
-            
-            # Show toast if response was slow (indicates potential network issues)
-            if response.elapsed.total_seconds() > 10:
-                st.toast("⏳ The server took a bit longer, but here's your answer!")
-            
-            # Parse quiz questions if present
-            quiz_questions = parse_quiz_response(assistant_response)
-            if quiz_questions:
-                st.session_state.quiz_questions = quiz_questions
-                st.session_state.waiting_for_quiz_confirmation = True
-            
-            # Update the chat
-            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-            message_placeholder.markdown(assistant_response)
-            
-            # If we have video suggestions, ask if they want to watch
-            if any(word in assistant_response.lower() for word in ['youtube', 'video', 'watch']):
-                st.session_state.waiting_for_video_confirmation = True
-            
-        except requests.exceptions.ConnectionError as e:
-            if "NameResolutionError" in str(e) or "Name or service not known" in str(e):
-                # Try offline mode as fallback
-                assistant_response = get_offline_response(prompt, st.session_state.subject, st.session_state.grade, st.session_state.language)
-                st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-                message_placeholder.markdown(assistant_response)
-                st.warning("🔄 Using offline mode - some features may be limited")
-            else:
-                error_msg = f"🔌 Connection Error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                message_placeholder.markdown(error_msg)
+    # Process regular questions
+    elif prompt:
+        # Answers are generated by a background job; the fragment below polls it
+        # Recent turns within the token budget, plus a running summary of older ones
+        history = st.session_state.conversation.messages(st.session_state.messages)
+        try:
+            job_id = get_job_queue().submit(
+                st.session_state.session_id, answer_question, query.text,
+                language, st.session_state.subject, st.session_state.grade, API_KEY, MODEL,
+                history=history
+            )
+        except JobLimitError:
+            st.warning("⏳ Please wait for your current question to finish (or cancel it) before asking another one.")
+        else:
+            st.session_state.pending_jobs.append(job_id)
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"🚫 Network Error: {str(e)}"
-            st.error(error_msg)
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
-            message_placeholder.markdown(error_msg)
+            # Add user message to chat history
+            st.session_state.messages.append(Message("user", prompt))
             
-        except Exception as e:
-            error_msg = f"❌ Unexpected Error: {str(e)}"
-            st.error(error_msg)
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
-            message_placeholder.markdown(error_msg)
+            # Display user message
+            with st.chat_message("user"):
+                st.markdown(prompt)
+
+if st.session_state.pending_jobs:
+    show_pending_answers()
 
 # Handle quiz flow
 if st.session_state.waiting_for_quiz_confirmation and st.session_state.quiz_questions:
     with st.chat_message("assistant"):
         st.markdown("Would you like to take a short quiz to test your understanding? (yes/no)")
 
-# Display current quiz question if quiz is in progress
-if st.session_state.quiz_started and st.session_state.quiz_questions:
-    if st.session_state.current_question < len(st.session_state.quiz_questions):
-        question = st.session_state.quiz_questions[st.session_state.current_question]
-        with st.chat_message("assistant"):
-            st.markdown(f"**Question {st.session_state.current_question + 1}:** {question['question']}")
-            
-            # Display options as buttons
-            options = question.get('options', [])
-            selected = None
-            
-            for i, option in enumerate(options):
-                if st.button(f"{chr(97+i)}) {option}"):
-                    selected = chr(97+i)
-                    # Check answer
-                    if selected == question.get('answer', '').lower():
-                        st.session_state.quiz_score += 1
-                        st.success("✅ Correct!")
-                    else:
-                        st.error(f"❌ Incorrect. The correct answer is {question.get('answer', 'unknown')}.")
-                    
-                    # Move to next question or show results
-                    st.session_state.current_question += 1
-                    if st.session_state.current_question < len(st.session_state.quiz_questions):
-                        st.rerun()
-                    else:
-                        # Calculate score
-                        score = (st.session_state.quiz_score / len(st.session_state.quiz_questions)) * 100
-                        
-                        # Provide feedback based on score
-                        if score < 50:
-                            feedback = "You might want to review the material and try again. Would you like to see the explanation again?"
-                        elif score < 90:
-                            feedback = f"Good job! You scored {score:.0f}%. Would you like to try a similar quiz to improve further?"
-                        else:
-                            feedback = f"Excellent work! You scored {score:.0f}%. Would you like to try a more challenging quiz?"
-                        
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": f"Quiz complete! Your score: {score:.0f}%. {feedback}"
-                        })
-                        st.session_state.quiz_started = False
-                        st.rerun()
+@st.fragment
+def show_quiz():
+    """Quiz UI; answering a question reruns only this fragment, not the chat history."""
+    if not st.session_state.quiz_started:
+        st.rerun()  # Quiz finished or exited - the result goes into the chat history, so redraw the page
     
+    if st.session_state.get("quiz_feedback"):
+        kind, feedback = st.session_state.quiz_feedback
+        getattr(st, kind)(feedback)
+    
+    question = st.session_state.quiz_questions[st.session_state.current_question]
+    with st.chat_message("assistant"):
+        st.markdown(f"**Question {st.session_state.current_question + 1}:** {question['question']}")
+        
+        # Display options as buttons
+        for i, option in enumerate(question.get('options', [])):
+            st.button(f"{chr(97+i)}) {option}", key=f"quiz-{st.session_state.current_question}-{i}",
+                      on_click=answer_quiz, args=(chr(97+i),))
+
     # Add a way to exit the quiz
-    if st.button("Exit Quiz"):
-        st.session_state.quiz_started = False
-        st.session_state.waiting_for_quiz_confirmation = False
-        st.rerun()
+    st.button("Exit Quiz", on_click=exit_quiz)
+
+# Display current quiz question if quiz is in progress
+if (st.session_state.quiz_started and st.session_state.quiz_questions
+        and st.session_state.current_question < len(st.session_state.quiz_questions)):
+    show_quiz()
+
+record_rerun(rerun_started)
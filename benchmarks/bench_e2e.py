@@ -0,0 +1,223 @@
+"""End-to-end latency and throughput benchmark against the mock OpenRouter.
+
+Drives the question pipeline (pipeline.answer_question, as the app's
+background jobs do) and helper.get_personalized_answer headlessly through
+a range of upstream conditions. Reports p50/p95/p99 latency, requests per
+second and bytes on the wire, and fails when a scenario regresses against
+the stored baseline.
+
+Run from the repository root:
+    python -m benchmarks.bench_e2e                     # compare with the baseline
+    python -m benchmarks.bench_e2e --update-baseline   # store the current numbers
+    python -m benchmarks.bench_e2e --scenario question_flow
+
+Each scenario runs --runs times (3 by default, 5 when updating the
+baseline) and the median of every statistic is reported and stored, so
+neither a lucky nor an unlucky run becomes the reference.
+
+The client-side rate limiter is opened up so the numbers measure the app,
+not API_RATE_LIMIT; caches and the quiz bank live in a temporary directory.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_openrouter import MockConfig, MockOpenRouter
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline_e2e.json")
+DEFAULT_TOLERANCE = 0.5  # Allowed relative slowdown before a scenario counts as a regression
+ABSOLUTE_SLACK = 0.05  # Seconds; keeps sub-10 ms percentiles and whole runs of them from flapping
+# Extra seconds for p95/p99: a request that waits out one hedge delay lands in the tail by chance.
+# p50 is held to the plain tolerance, so a real slowdown still shows up there.
+TAIL_SLACK = 0.5
+DEFAULT_RUNS = 3
+BASELINE_RUNS = 5
+
+# name -> (mock settings, workload, requests, concurrency)
+SCENARIOS = {
+    "question_flow": ({}, "question", 40, 8),
+    "cached_repeat": ({}, "repeat", 40, 8),
+    "personalized": ({}, "personalized", 40, 8),
+    "hindi_flow": ({}, "hindi", 20, 4),
+    "stalled_model": ({"stall_rate": 0.2, "stall": 2.0}, "question", 40, 4),
+    "upstream_errors": ({"error_rate": 0.2, "errors": (429, 500, 503)}, "question", 40, 4),
+    "dns_failure": ({"dns_failure": True}, "question", 10, 2),
+}
+
+
+def configure(base_url, workdir):
+    """Point the app's settings at the mock; must run before the app modules are imported."""
+    os.environ.update({
+        "OPENROUTER_API_KEY": "bench-key",
+        "OPENROUTER_BASE_URL": base_url,
+        "RESPONSE_CACHE_PATH": os.path.join(workdir, "responses.sqlite3"),
+        "QUIZ_BANK_PATH": os.path.join(workdir, "quiz_bank.sqlite3"),
+        "API_RATE_LIMIT": "10000",
+        "API_BURST": "10000",
+        "ROUTER_HEDGE_AFTER": "0.5",
+        "ROUTER_FALLBACK_MODELS": "bench/fallback-model",
+    })
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+def make_workload(kind, scenario):
+    """A function of the request number that runs one request and returns its outcome."""
+    from helper import get_personalized_answer
+    from jobs import Job
+    from pipeline import answer_question
+
+    def question(i):
+        # Unique wording per request, so every one goes past the cache and knowledge base
+        job = Job(f"{scenario}-{i}", "bench")
+        result = answer_question(job, f"Explain how the {scenario} benchmark topic number {i} works in daily life",
+                                 "English", "Science", 6, "bench-key", "gpt-4o-mini")
+        return "error" if result["text"].startswith(("❌", "🚫", "🔌")) else "ok"
+
+    def hindi(i):
+        job = Job(f"{scenario}-{i}", "bench")
+        result = answer_question(job, f"बेंचमार्क {scenario} विषय संख्या {i} रोज़मर्रा के जीवन में कैसे काम करता है?",
+                                 "हिंदी (Hindi)", "Science", 4, "bench-key", "gpt-4o-mini")
+        return "error" if result["text"].startswith(("❌", "🚫", "🔌")) else "ok"
+
+    def repeat(i):
+        job = Job(f"{scenario}-{i}", "bench")
+        answer_question(job, "Why do we see lightning before we hear thunder in a storm",
+                        "English", "Science", 7, "bench-key", "gpt-4o-mini")
+        return "ok"
+
+    def personalized(i):
+        answer = get_personalized_answer(f"Why is the {scenario} sky question number {i} interesting",
+                                         "ENFP", "Visual", "en", "Asha")
+        return "error" if answer.startswith(("Error", "Sorry")) else "ok"
+
+    return {"question": question, "hindi": hindi, "repeat": repeat, "personalized": personalized}[kind]
+
+
+def run_scenario(server, name, run=0):
+    """One run of a scenario; run numbers keep the questions of repeated runs from hitting the cache."""
+    import llm_client
+
+    settings, kind, requests_count, concurrency = SCENARIOS[name]
+    config = MockConfig(**{key: value for key, value in settings.items() if key != "dns_failure"})
+    server.httpd.config = config
+    base_url = server.base_url
+    llm_client.API_BASE = "http://openrouter.invalid/api/v1" if settings.get("dns_failure") else base_url
+
+    workload = make_workload(kind, f"{name} {run}" if run else name)
+    if kind == "repeat":
+        workload(-1)  # Warm the cache; the scenario measures hits
+    before = server.stats.snapshot()
+    latencies, outcomes = [], []
+
+    def timed(i):
+        started = time.perf_counter()
+        outcome = workload(i)
+        latencies.append(time.perf_counter() - started)
+        outcomes.append(outcome)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests_count)))
+    wall = time.perf_counter() - started
+    after = server.stats.snapshot()
+    llm_client.API_BASE = base_url
+
+    return {
+        "requests": requests_count,
+        "ok": outcomes.count("ok"),
+        "p50": round(percentile(latencies, 0.5), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "p99": round(percentile(latencies, 0.99), 4),
+        "rps": round(requests_count / wall, 2),
+        "upstream_requests": after["requests"] - before["requests"],
+        "bytes": (after["bytes_in"] - before["bytes_in"]) + (after["bytes_out"] - before["bytes_out"]),
+    }
+
+
+def median_result(runs):
+    """Median of every statistic over several runs of one scenario."""
+    middle = len(runs) // 2
+    return {stat: sorted(run[stat] for run in runs)[middle] for stat in runs[0]}
+
+
+def regressions(results, baseline, tolerance):
+    """Descriptions of every scenario that got slower or less successful than its baseline."""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for stat in ("p50", "p95", "p99"):
+            limit = base[stat] * (1 + tolerance) + ABSOLUTE_SLACK + (TAIL_SLACK if stat != "p50" else 0)
+            if result[stat] > limit:
+                found.append(f"{name}: {stat} {result[stat]:.3f}s > {limit:.3f}s")
+        # Held to the same slack as a latency: the run may take ABSOLUTE_SLACK longer, so a few
+        # milliseconds of scheduling noise can't fail a scenario that finishes in ten
+        wall = result["requests"] / base["rps"] * (1 + tolerance) + ABSOLUTE_SLACK
+        min_rps = result["requests"] / wall
+        if result["rps"] < min_rps:
+            found.append(f"{name}: {result['rps']} req/s < {min_rps:.2f} req/s")
+        if result["ok"] < base["ok"]:
+            found.append(f"{name}: {result['ok']}/{result['requests']} succeeded, baseline {base['ok']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--runs", type=int, default=None,
+                        help=f"runs per scenario, median reported (default {DEFAULT_RUNS}, {BASELINE_RUNS} "
+                             "with --update-baseline)")
+    args = parser.parse_args()
+    runs = args.runs or (BASELINE_RUNS if args.update_baseline else DEFAULT_RUNS)
+
+    server = MockOpenRouter().start()
+    configure(server.base_url, tempfile.mkdtemp(prefix="learningbuddy-bench-"))
+
+    # Load the knowledge base, open the databases and start the health check outside the measurements
+    make_workload("question", "warmup")(0)
+
+    results = {}
+    print(f"{'scenario':<16} {'ok':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'upstream':>9} {'bytes':>10}")
+    for name in args.scenario or SCENARIOS:
+        result = results[name] = median_result([run_scenario(server, name, run) for run in range(runs)])
+        print(f"{name:<16} {result['ok']:>3}/{result['requests']:<3} {result['p50']:>8.3f} {result['p95']:>8.3f} "
+              f"{result['p99']:>8.3f} {result['rps']:>8.2f} {result['upstream_requests']:>9} {result['bytes']:>10}")
+    server.stop()
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet; run with --update-baseline to store one.")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        found = regressions(results, json.load(f), args.tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    print(f"\n{len(results) - len({r.split(':')[0] for r in found})}/{len(results)} scenarios within baseline")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Throughput benchmark for the streaming quiz parser; its correctness cases live in tests/test_quiz_parser.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_quiz_parser
+"""
+import time
+
+from quiz_parser import QuizStreamParser
+
+# A long response is this block repeated: an English quiz and a Hindi one
+SAMPLE = """Photosynthesis is how plants make food! 🌱
+
+**Quiz**
+Q1. What do plants need for photosynthesis?
+a) Sunlight
+b) Darkness
+c) Sand
+d) Plastic
+Answer: a
+
+प्रश्न 2: पौधे भोजन कहाँ बनाते हैं?
+क) जड़
+ख) पत्ती
+ग) फूल
+घ) बीज
+उत्तर: ख
+"""
+
+
+def bench_throughput(repeat=2000, chunk_size=16):
+    """Feed a long synthetic response in small chunks and report MB/s."""
+    text = SAMPLE * repeat
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    parser = QuizStreamParser(max_questions=float("inf"), keep_questions=False)
+    start = time.perf_counter()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    elapsed = time.perf_counter() - start
+    size_mb = len(text.encode("utf-8")) / 1e6
+    print(f"throughput: {parser.count} questions, {size_mb:.1f} MB in {elapsed:.2f}s "
+          f"({size_mb / elapsed:.1f} MB/s, {parser.count / elapsed:,.0f} questions/s)")
+
+
+if __name__ == "__main__":
+    bench_throughput()
@@ -0,0 +1,118 @@
+"""Cold-start and per-rerun overhead of app.py.
+
+Each sample runs in a fresh interpreter, as a new server instance would:
+    imports     importing streamlit and the app's modules
+    first_run   the first full run of app.py (the first page a student sees)
+    startup     building the shared clients and indexes (bootstrap.warm_up)
+    rerun       one full rerun of app.py after that, as timed by the app itself
+
+Run from the repository root:
+    python -m benchmarks.bench_startup                     # compare with the baseline
+    python -m benchmarks.bench_startup --update-baseline   # store the current numbers
+
+The app talks to the mock OpenRouter and keeps its databases in a
+temporary directory, so no network or real data is touched.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_openrouter import MockOpenRouter
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline_startup.json")
+DEFAULT_TOLERANCE = 0.5
+ABSOLUTE_SLACK = 0.02  # Seconds; keeps millisecond timings from flapping
+
+
+def measure(reruns):
+    """One cold sample; runs in the child interpreter and returns seconds per phase."""
+    started = time.perf_counter()
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    import bootstrap
+    from metrics import get_metrics
+    imports = time.perf_counter() - started
+
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    first_started = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - first_started
+    bootstrap.warm_up().join()
+    for _ in range(reruns):
+        app.run()
+
+    stages = {row["stage"]: row for row in get_metrics().snapshot()["stages"]}
+    return {
+        "imports": imports,
+        "first_run": first_run,
+        "startup": stages["startup"]["mean"],
+        "rerun_p50": stages["rerun"]["p50"],
+        "rerun_p95": stages["rerun"]["p95"],
+    }
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--reruns", type=int, default=30, help="reruns timed in each")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.reruns)))
+        return 0
+
+    server = MockOpenRouter().start()
+    workdir = tempfile.mkdtemp(prefix="learningbuddy-startup-")
+    env = dict(os.environ, OPENROUTER_API_KEY="bench-key", OPENROUTER_BASE_URL=server.base_url,
+               RESPONSE_CACHE_PATH=os.path.join(workdir, "responses.sqlite3"),
+               QUIZ_BANK_PATH=os.path.join(workdir, "quiz_bank.sqlite3"),
+               PROGRESS_DB_PATH=os.path.join(workdir, "progress.sqlite3"))
+    samples = []
+    for _ in range(args.samples):
+        child = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child",
+                                "--reruns", str(args.reruns)],
+                               env=env, capture_output=True, text=True, check=True)
+        samples.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    server.stop()
+
+    results = {phase: round(median([sample[phase] for sample in samples]), 4) for phase in samples[0]}
+    for phase, seconds in results.items():
+        print(f"{phase:<10} {seconds * 1000:8.1f} ms")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet; run with --update-baseline to store one.")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    found = [f"{phase}: {results[phase] * 1000:.1f} ms > {limit * 1000:.1f} ms"
+             for phase, limit in ((phase, base * (1 + args.tolerance) + ABSOLUTE_SLACK)
+                                  for phase, base in baseline.items() if phase in results)
+             if results[phase] > limit]
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    print(f"\n{len(results) - len(found)}/{len(results)} phases within baseline")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
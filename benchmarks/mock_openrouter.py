@@ -0,0 +1,280 @@
+"""Local stand-in for the OpenRouter API, for offline tests and benchmarks.
+
+Serves GET /api/v1/models and POST /api/v1/chat/completions (streaming and
+not) with canned English/Hindi explanations, quizzes and video lines, plus
+configurable latency and injected failures.
+
+Run from the repository root, then point the app at it:
+    python -m benchmarks.mock_openrouter --port 8765 --first-token 0.3 --error-rate 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1 streamlit run app.py
+
+DNS failures cannot come from a server; use an unresolvable base URL such
+as http://openrouter.invalid/api/v1 for those.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXPLANATIONS = {
+    "en": """## 🌟 Let's learn!
+
+Great question! Here is the idea in simple steps:
+
+1. **What it is** - every big idea starts with a small, everyday example 🍎
+2. **How it works** - things around us follow patterns we can observe 🔍
+3. **Why it matters** - knowing this helps us understand the world 🌍
+
+Try this: look around your room and find one example of it! 😊""",
+    "hi": """## 🌟 चलो सीखें!
+
+बहुत अच्छा प्रश्न! इसे आसान चरणों में समझते हैं:
+
+1. **यह क्या है** - हर बड़ा विचार एक छोटे, रोज़मर्रा के उदाहरण से शुरू होता है 🍎
+2. **यह कैसे काम करता है** - हमारे आस-पास की चीज़ें ऐसे नियमों पर चलती हैं जिन्हें हम देख सकते हैं 🔍
+3. **यह क्यों ज़रूरी है** - इसे जानकर हम दुनिया को बेहतर समझते हैं 🌍
+
+कोशिश करो: अपने कमरे में इसका एक उदाहरण ढूँढो! 😊""",
+}
+
+QUIZ_QUESTIONS = {
+    "en": [
+        ("What do plants need to make food?", ["Sunlight", "Sand", "Plastic", "Iron"], "a"),
+        ("Which gas do we breathe in?", ["Helium", "Oxygen", "Neon", "Argon"], "b"),
+        ("How many legs does an insect have?", ["Four", "Eight", "Six", "Ten"], "c"),
+        ("Which is the largest planet?", ["Mars", "Venus", "Earth", "Jupiter"], "d"),
+        ("What is 7 x 8?", ["56", "54", "48", "64"], "a"),
+        ("Which organ pumps blood around the body?", ["Lungs", "Heart", "Liver", "Kidney"], "b"),
+        ("What is the boiling point of water at sea level?", ["50 °C", "75 °C", "100 °C", "150 °C"], "c"),
+        ("Which shape has three sides?", ["Square", "Circle", "Pentagon", "Triangle"], "d"),
+        ("What does a thermometer measure?", ["Temperature", "Weight", "Length", "Time"], "a"),
+        ("Which planet is closest to the Sun?", ["Venus", "Mercury", "Mars", "Earth"], "b"),
+    ],
+    "hi": [
+        ("पौधे भोजन बनाने के लिए किसका उपयोग करते हैं?", ["सूर्य का प्रकाश", "रेत", "प्लास्टिक", "लोहा"], "a"),
+        ("हम साँस में कौन सी गैस लेते हैं?", ["हीलियम", "ऑक्सीजन", "नियॉन", "आर्गन"], "b"),
+        ("कीट के कितने पैर होते हैं?", ["चार", "आठ", "छह", "दस"], "c"),
+        ("सबसे बड़ा ग्रह कौन सा है?", ["मंगल", "शुक्र", "पृथ्वी", "बृहस्पति"], "d"),
+        ("7 x 8 कितना होता है?", ["56", "54", "48", "64"], "a"),
+        ("शरीर में खून कौन सा अंग पंप करता है?", ["फेफड़े", "हृदय", "यकृत", "गुर्दा"], "b"),
+        ("समुद्र तल पर पानी किस तापमान पर उबलता है?", ["50 °C", "75 °C", "100 °C", "150 °C"], "c"),
+        ("किस आकृति की तीन भुजाएँ होती हैं?", ["वर्ग", "वृत्त", "पंचभुज", "त्रिभुज"], "d"),
+        ("थर्मामीटर क्या मापता है?", ["तापमान", "भार", "लंबाई", "समय"], "a"),
+        ("सूर्य के सबसे पास कौन सा ग्रह है?", ["शुक्र", "बुध", "मंगल", "पृथ्वी"], "b"),
+    ],
+}
+
+VIDEOS = {
+    "en": "🎥 [Fun science for kids](https://www.youtube.com/results?search_query=science+for+kids)",
+    "hi": "🎥 [बच्चों के लिए विज्ञान](https://www.youtube.com/results?search_query=bachon+ke+liye+vigyan)",
+}
+
+
+def canned_quiz(language, count=10):
+    questions = QUIZ_QUESTIONS[language]
+    lines = []
+    for number in range(count):
+        question, options, answer = questions[number % len(questions)]
+        lines.append(f"Q{number + 1}. {question}")
+        lines.extend(f"{letter}) {option}" for letter, option in zip("abcd", options))
+        lines.append(f"Answer: {answer}\n")
+    return "\n".join(lines)
+
+
+def canned_reply(messages):
+    """Pick the canned text the prompt asks for: quiz, video line or explanation, in English or Hindi."""
+    system = " ".join(message["content"] for message in messages if message["role"] == "system")
+    language = "hi" if ("Hindi" in system or "हिंदी" in system) else "en"
+    if "multiple choice quiz" in system:
+        return canned_quiz(language)
+    if "YouTube video" in system:
+        return VIDEOS[language]
+    return EXPLANATIONS[language] + "\n\n" + VIDEOS[language]
+
+
+class MockConfig:
+    """Behaviour of the mock; fields can be changed while the server runs."""
+
+    def __init__(self, first_token=0.05, chunk_delay=0.005, chunk_size=24, error_rate=0.0,
+                 errors=(429, 500, 503), stall_rate=0.0, stall=5.0, model_first_token=None, seed=1729):
+        self.first_token = first_token  # Seconds before the first byte of a response
+        self.chunk_delay = chunk_delay  # Seconds between streamed chunks
+        self.chunk_size = chunk_size  # Characters per streamed chunk
+        self.error_rate = error_rate  # Fraction of completions answered with one of `errors`
+        self.errors = errors  # HTTP statuses to inject; "timeout" hangs past the client's timeout
+        self.stall_rate = stall_rate  # Fraction of completions that wait `stall` extra seconds
+        self.stall = stall
+        self.model_first_token = model_first_token or {}  # Per-model first_token overrides
+        self.random = random.Random(seed)
+
+
+class MockStats:
+    def __init__(self):
+        self.requests = 0
+        self.completions = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def add(self, **counts):
+        with self.lock:
+            for name, amount in counts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "completions": self.completions, "errors": self.errors,
+                    "bytes_in": self.bytes_in, "bytes_out": self.bytes_out, "models": dict(self.models)}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.stats.add(requests=1)
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"data": [{"id": "gpt-4o-mini"}, {"id": "openai/gpt-4o"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        stats, config = self.server.stats, self.server.config
+        stats.add(requests=1, bytes_in=len(body))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        payload = json.loads(body)
+        model = payload.get("model", "")
+        with stats.lock:
+            stats.models[model] = stats.models.get(model, 0) + 1
+            roll, stall_roll = config.random.random(), config.random.random()
+            error = config.random.choice(config.errors) if config.errors else 500
+
+        time.sleep(config.model_first_token.get(model, config.first_token))
+        if stall_roll < config.stall_rate:
+            time.sleep(config.stall)
+        if roll < config.error_rate:
+            stats.add(errors=1)
+            if error == "timeout":
+                time.sleep(600)
+                return
+            headers = {"Retry-After": "1"} if error == 429 else {}
+            self._send_json(error, {"error": {"message": f"injected {error}"}}, headers)
+            return
+
+        stats.add(completions=1)
+        text = canned_reply(payload.get("messages", []))
+        if payload.get("stream"):
+            self._stream(model, text, config)
+        else:
+            self._send_json(200, {"model": model, "choices": [{"message": {"role": "assistant", "content": text}}]})
+
+    def _stream(self, model, text, config):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        try:
+            for start in range(0, len(text), config.chunk_size):
+                event = {"model": model, "choices": [{"delta": {"content": text[start:start + config.chunk_size]}}]}
+                sent += self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                time.sleep(config.chunk_delay)
+            sent += self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client stopped listening (cancelled or lost a hedge race)
+        self.server.stats.add(bytes_out=sent)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+        return len(data)
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.add(bytes_out=len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections on purpose (cancelled answers, lost hedge races)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MockOpenRouter:
+    """The mock server on a background thread; use base_url as OPENROUTER_BASE_URL."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.httpd = MockServer((host, port), MockHandler)
+        self.httpd.config = config or MockConfig()
+        self.httpd.stats = MockStats()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-openrouter", daemon=True)
+
+    @property
+    def config(self):
+        return self.httpd.config
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token", type=float, default=0.3, help="seconds before the first byte")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions that fail")
+    parser.add_argument("--errors", default="429,500,503",
+                        help="comma-separated statuses to inject; 'timeout' hangs the request")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of completions that stall")
+    parser.add_argument("--stall", type=float, default=5.0, help="extra seconds a stalled completion waits")
+    args = parser.parse_args()
+
+    errors = tuple(error if error == "timeout" else int(error) for error in args.errors.split(",") if error)
+    config = MockConfig(first_token=args.first_token, chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                        errors=errors, stall_rate=args.stall_rate, stall=args.stall)
+    server = MockOpenRouter(config, args.host, args.port)
+    print(f"Mock OpenRouter listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
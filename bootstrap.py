@@ -0,0 +1,74 @@
+"""Process-level setup for app.py.
+
+Streamlit executes app.py again on every interaction. Configuration, the
+stylesheet and the shared clients are resolved here once per process
+through st.cache_resource, so a rerun only pays for a cache lookup.
+"""
+import os
+import threading
+import time
+
+import streamlit as st
+
+from knowledge_base import get_knowledge_base
+from llm_client import get_health_monitor, get_session
+from metrics import get_metrics
+from pipeline import get_executor
+from progress_store import get_progress_store
+from quiz_bank import get_quiz_bank
+from response_cache import get_response_cache
+from router import get_router
+
+STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+
+@st.cache_resource
+def get_config():
+    """API key, model and admin token from Streamlit secrets, else the environment and .env."""
+    try:
+        secrets = st.secrets.to_dict()
+    except FileNotFoundError:
+        secrets = {}  # No secrets.toml - local development
+    if "OPENROUTER_API_KEY" not in secrets:
+        from dotenv import load_dotenv  # Only needed without secrets
+        load_dotenv()
+
+    def setting(name, default=None):
+        return secrets.get(name) or os.getenv(name, default)
+
+    return {
+        "api_key": setting("OPENROUTER_API_KEY"),
+        "model": setting("MODEL", "gpt-4o-mini"),
+        "admin_token": setting("ADMIN_TOKEN", ""),
+    }
+
+
+@st.cache_resource
+def get_stylesheet():
+    """style.css as a <style> block, read from disk once."""
+    with open(STYLE_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+@st.cache_resource
+def warm_up():
+    """Build the shared clients, indexes and databases on a background thread.
+
+    The first page draws without waiting for them, and by the time the first
+    question arrives they are usually ready. The build time is recorded as
+    the "startup" stage.
+    """
+    def build():
+        with get_metrics().time("startup"):
+            for factory in (get_session, get_health_monitor, get_response_cache, get_knowledge_base,
+                            get_quiz_bank, get_progress_store, get_router, get_executor):
+                factory()
+
+    thread = threading.Thread(target=build, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_rerun(started):
+    """Observe one full run of app.py; started is time.perf_counter() at the top of the script."""
+    get_metrics().observe("rerun", time.perf_counter() - started)
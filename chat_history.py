@@ -0,0 +1,60 @@
+import os
+import re
+import sys
+from functools import lru_cache
+
+import streamlit as st
+
+HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", 6))  # Recent turns rendered in full
+HISTORY_PAGE_SIZE = 10  # Older messages per page in the collapsed view
+PREVIEW_LENGTH = 120
+
+ROLE_ICONS = {"user": "🧒", "assistant": "🤖"}
+_MARKDOWN_RE = re.compile(r"[#*_`>\[\]]+|\(https?://[^)]*\)")
+
+
+class Message:
+    """One chat message; slots and interned roles keep long sessions small."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role, content):
+        self.role = sys.intern(role)
+        self.content = content
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+
+@lru_cache(maxsize=2048)
+def preview(content):
+    """One-line plain-text summary of a message, memoized per content."""
+    text = " ".join(_MARKDOWN_RE.sub("", content).split())
+    return text if len(text) <= PREVIEW_LENGTH else text[:PREVIEW_LENGTH - 1] + "…"
+
+
+def render_history(messages, window=HISTORY_WINDOW):
+    """Render the last `window` turns in full and older messages as a paged, collapsed list.
+
+    Per-rerun work stays bounded however long the session gets: at most
+    2 * window full messages plus one page of one-line previews.
+    Only the messages shown are indexed, so a lazily loaded history
+    (progress_store.History) reads no more than that from disk.
+    """
+    split = max(0, len(messages) - 2 * window)
+
+    if split:
+        with st.expander(f"🕘 Earlier messages / पिछले संदेश ({split})"):
+            pages = (split + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+            page = 1
+            if pages > 1:
+                page = st.number_input("Page / पृष्ठ", min_value=1, max_value=pages, value=pages, step=1)
+            start = (page - 1) * HISTORY_PAGE_SIZE
+            for message in messages[start:min(split, start + HISTORY_PAGE_SIZE)]:
+                if message.role in ROLE_ICONS:
+                    st.markdown(f"{ROLE_ICONS[message.role]} {preview(message.content)}")
+
+    for message in messages[split:]:
+        if message.role in ROLE_ICONS:
+            with st.chat_message(message.role):
+                st.markdown(message.content)
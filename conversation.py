@@ -0,0 +1,153 @@
+import os
+import re
+from collections import deque
+from functools import lru_cache
+
+from chat_history import preview
+from knowledge_base import tokenize
+from quiz_parser import strip_quiz
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1200))  # Recent turns sent verbatim
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", 300))  # Running summary of older turns
+MESSAGE_OVERHEAD = 4  # Tokens the chat format adds per message
+SUMMARY_LINE_LENGTH = 90
+
+FOLLOW_UP_MAX_WORDS = 6  # Longer questions only count as follow-ups with an explicit back-reference
+
+# "Explain that again", "tell me more", "इसे आसान भाषा में बताओ" - asking about the previous answer in any length
+_BACK_REFERENCE_RE = re.compile(
+    r"\b(?:again|once more|tell me more|what about|in simpler words|in easier words)\b"
+    r"|(?:फिर से|दोबारा|और बताओ|आसान भाषा)"
+    r"|^\W*(?:why|how|what about|और|क्यों|कैसे)\W*$",
+    re.IGNORECASE,
+)
+# Pronouns that can only point back; a follow-up in a short question or one that starts with them,
+# since "how do volcanoes erupt and why are they dangerous?" stands alone
+_REFERENCE_RE = re.compile(
+    r"\b(?:it|its|they|them|their)\b"
+    r"|(?:इसे|इसको|उसे|उसको|इसका|इसकी|इसके|उसका|उसकी|उसके|इसमें|उसमें)",
+    re.IGNORECASE,
+)
+# Words that point back only when nothing else names a topic: "explain this more simply" does,
+# "why do we need more trees?" and "what is this called in Hindi?" do not
+_DETERMINER_RE = re.compile(
+    r"\b(?:this|that|these|those|simpler|easier|more|another|same|above|previous|earlier)\b|(?:आसान)",
+    re.IGNORECASE,
+)
+# Words of a follow-up that say how to answer rather than what about
+_FOLLOW_UP_FILLER_RE = re.compile(
+    r"\b(?:again|simpler|simple|simply|easier|easy|easily|more|another|same|above|previous|earlier|once|words?|terms?|way|"
+    r"language|examples?|detail|please|pls|plz|tell|explain|say)\b"
+    r"|(?:इसे|इसको|उसे|उसको|इसका|इसकी|इसके|उसका|उसकी|उसके|इसमें|उसमें|फिर से|दोबारा|आसान|भाषा|शब्दों|उदाहरण|और|बताओ|समझाओ)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text):
+    """Cheap token estimate: ~4 characters per token for Latin text, ~2 for Devanagari."""
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + MESSAGE_OVERHEAD
+
+
+@lru_cache(maxsize=2048)
+def history_text(content):
+    """A message as it goes into the prompt: quizzes are long and useless as context."""
+    return strip_quiz(content)
+
+
+def is_follow_up(question):
+    """True if the question refers back to the conversation rather than standing alone."""
+    question = question.strip()
+    if _BACK_REFERENCE_RE.search(question):
+        return True
+    words = question.split()
+
+    def leads(reference):
+        return reference is not None and (
+            len(words) <= FOLLOW_UP_MAX_WORDS or question.find(words[0]) == reference.start())
+
+    if leads(_REFERENCE_RE.search(question)):
+        return True
+    return leads(_DETERMINER_RE.search(question)) and not has_own_topic(question)
+
+
+def has_own_topic(question):
+    """True if a follow-up still names a subject of its own ("explain photosynthesis again")."""
+    return bool(tokenize(_FOLLOW_UP_FILLER_RE.sub(" ", question)))
+
+
+def _clip(text):
+    text = preview(text)
+    return text if len(text) <= SUMMARY_LINE_LENGTH else text[:SUMMARY_LINE_LENGTH - 1] + "…"
+
+
+class ConversationContext:
+    """Token-budgeted view of a chat history for the model.
+
+    The newest turns that fit in `budget` are sent verbatim. Turns that slide
+    out of that window are folded, once each, into a running summary that is
+    itself capped at `summary_budget` by dropping its oldest lines - so the
+    work per question is bounded by the window, not the session length.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET, folded=0):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        # Messages at the front of the history already in the summary (or, for a restored
+        # session, deliberately left out of it so they are never read back)
+        self.folded = folded
+        self._summary = deque()
+        self._summary_tokens = 0
+
+    @property
+    def summary(self):
+        return "\n".join(self._summary)
+
+    def window_start(self, history):
+        """Index of the oldest message that still fits in the token budget."""
+        used = 0
+        start = len(history)
+        for index in range(len(history) - 1, self.folded - 1, -1):
+            tokens = count_tokens(history_text(history[index].content))
+            if used + tokens > self.budget:
+                break
+            used += tokens
+            start = index
+        return start
+
+    def update(self, history):
+        """Fold messages that no longer fit into the summary; returns the window start."""
+        start = self.window_start(history)
+        for message in history[self.folded:start]:
+            self._fold(message)
+        self.folded = max(self.folded, start)
+        return self.folded
+
+    def _fold(self, message):
+        if message.role == "user":
+            line = f"- Student asked: {_clip(message.content)}"
+        elif message.role == "assistant" and self._summary and self._summary[-1].startswith("- Student asked"):
+            line = f"  Tutor explained: {_clip(history_text(message.content))}"
+        else:
+            return  # Greetings and quiz results add nothing a follow-up needs
+        self._summary.append(line)
+        self._summary_tokens += count_tokens(line)
+        while self._summary_tokens > self.summary_budget and self._summary:
+            self._summary_tokens -= count_tokens(self._summary.popleft())
+            # Drop a turn's tutor line together with its question
+            while self._summary and not self._summary[0].startswith("- "):
+                self._summary_tokens -= count_tokens(self._summary.popleft())
+
+    def messages(self, history):
+        """Chat messages to put between the system prompt and the new question."""
+        start = self.update(history)
+        messages = []
+        if self._summary:
+            messages.append({"role": "system", "content": "Earlier in this conversation:\n" + self.summary})
+        messages.extend(
+            {"role": message.role, "content": history_text(message.content)}
+            for message in history[start:]
+            if message.role in ("user", "assistant")
+        )
+        return messages
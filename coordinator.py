@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", 5))  # Upstream requests per second
+API_BURST = int(os.getenv("API_BURST", 10))
+API_MAX_WAITING = int(os.getenv("API_MAX_WAITING", 50))
+API_MAX_WAIT = float(os.getenv("API_MAX_WAIT", 15))  # Seconds a request may queue for a token
+
+
+class BackpressureError(Exception):
+    """Raised when the rate limiter's queue is full or the wait would be too long."""
+
+
+class FlightCancelled(Exception):
+    """Ends a flight that was stopped because every subscriber went away."""
+
+
+def request_key(payload):
+    """Single-flight key: the model plus the full message payload."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class TokenBucket:
+    """Token-bucket limiter with a bounded queue of waiters."""
+
+    def __init__(self, rate=API_RATE_LIMIT, burst=API_BURST, max_waiting=API_MAX_WAITING, max_wait=API_MAX_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop=None):
+        """Take a token, sleeping for our turn; raises BackpressureError instead of queueing too long."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            if self._waiting >= self.max_waiting:
+                raise BackpressureError(f"{self._waiting} requests already waiting")
+            wait = (1 - self._tokens) / self.rate
+            if wait > self.max_wait:
+                raise BackpressureError(f"would wait {wait:.0f}s for a request slot")
+            self._tokens -= 1  # Reserve a future token; later callers queue behind us
+            self._waiting += 1
+        try:
+            if stop is not None:
+                stop.wait(wait)
+            else:
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+
+class Flight:
+    """One upstream request and the chunks it has produced so far."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.stop = threading.Event()
+        self.cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.error = error
+            self.done = True
+            self.cond.notify_all()
+
+
+class RequestCoordinator:
+    """Collapse identical in-flight requests into one upstream call and rate-limit the rest."""
+
+    def __init__(self, limiter=None, max_workers=32):
+        self.limiter = limiter or TokenBucket()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+        self.stats = {"upstream": 0, "coalesced": 0, "rejected": 0}
+
+    def stream(self, key, producer, cancel_event=None):
+        """Yield the chunks of producer(stop_event), sharing them between identical requests.
+
+        The first caller for a key starts producer on a background thread;
+        later callers with the same key replay its chunks and then follow
+        along live. When every caller has gone away the flight is dropped and
+        its stop event set, so the producer can close its upstream connection
+        and a later identical request starts a fresh one.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                self.stats["upstream"] += 1
+                self._executor.submit(self._fly, key, flight, producer)
+            else:
+                self.stats["coalesced"] += 1
+            flight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                with flight.cond:
+                    while index == len(flight.chunks) and not flight.done:
+                        flight.cond.wait(0.25)
+                        if cancel_event is not None and cancel_event.is_set():
+                            return
+                    chunks = flight.chunks[index:]
+                    index += len(chunks)
+                    done, error = flight.done, flight.error
+                for chunk in chunks:
+                    yield chunk
+                if done and index == len(flight.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and not flight.done:
+                    flight.stop.set()
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+
+    def _fly(self, key, flight, producer):
+        try:
+            self.limiter.acquire(flight.stop)
+            if not flight.stop.is_set():  # Don't pay for a request nobody is waiting for
+                for chunk in producer(flight.stop):
+                    if flight.stop.is_set():
+                        break
+                    flight.publish(chunk)
+            flight.finish(FlightCancelled("every subscriber went away") if flight.stop.is_set() else None)
+        except BackpressureError as e:
+            self.stats["rejected"] += 1
+            flight.finish(e)
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+
+@st.cache_resource
+def get_coordinator():
+    """Coordinator shared by every Streamlit session, so a classroom burst becomes one call."""
+    return RequestCoordinator()
@@ -1,97 +1,167 @@
+import contextlib
+
 import requests
 import streamlit as st
+from bootstrap import get_config
+from streaming import iter_stream_deltas, StreamTimer
+from response_cache import get_response_cache, make_cache_key
+from llm_client import send_chat_completion
+from retry import CircuitOpenError
+from coordinator import BackpressureError, get_coordinator, request_key
+from knowledge_base import get_knowledge_base
+from conversation import is_follow_up
+from router import AllModelsFailed, get_router
+from preprocess import local_reply, preprocess
+from prompts import get_template
+
+OFFLINE_MESSAGE = "The tutor service is busy right now. Please try again in a minute. 🙏"
+BUSY_MESSAGE = "Lots of students are asking questions right now! Please wait a few seconds and ask again. ⏳"
+
+def _get_api_key():
+    """The OpenRouter key from the process-wide config, or None if it is missing."""
+    api_key = get_config()["api_key"]
+    if not api_key:
+        st.error("API key not found. Please set OPENROUTER_API_KEY in Streamlit secrets.")
+    return api_key
+
+
+def _personalized_start(api_key, messages, max_tokens):
+    """start(model, stop) for ModelRouter.stream: one streamed personalized completion per model."""
+    def start(model, stop):
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
 
-MODEL = "gpt-4o-mini"
+        def produce(flight_stop):
+            response = send_chat_completion(api_key, payload, stream=True, read_timeout=30)
+            with response:
+                for delta in iter_stream_deltas(response):
+                    if flight_stop.is_set():
+                        return
+                    yield delta
 
-def get_personalized_answer(question, mbti, learning_style, language="en", name=""):
+        # Identical in-flight requests from other sessions share one upstream call
+        return get_coordinator().stream(request_key(payload), produce, stop)
+    return start
+
+
+def get_personalized_answer(question, mbti, learning_style, language="en", name="", history=None):
+    """Answer a question for one learner.
+
+    history is the conversation so far, from ConversationContext.messages; it
+    is sent with follow-up questions ("explain that again") only.
+    """
     if not question.strip():
         return "Please enter a valid question."
+    # Greetings, thanks and yes/no are answered locally, without a completion
+    query = preprocess(question)
+    if query.intent != "question":
+        return local_reply(query.intent, language)
+    question = query.text
 
     # Check API key
-    try:
-        API_KEY = st.secrets["OPENROUTER_API_KEY"]
-    except KeyError:
-        st.error("API key not found. Please set OPENROUTER_API_KEY in Streamlit secrets.")
+    API_KEY = _get_api_key()
+    if API_KEY is None:
         return "Error: API key missing. Check your setup."
 
-    if language == "hi":
-        prompt = f"""
-        आप एक अनुकूल, सहायक और रचनात्मक AI शिक्षक हैं, जो विशेष रूप से 6-14 वर्ष की आयु के बच्चों के लिए डिज़ाइन किया गया है। आपका उद्देश्य अवधारणाओं को आसान, मज़ेदार और दृष्टिगत रूप से आकर्षक तरीके से समझाना है। बच्चे के प्रश्न का उत्तर इस तरह दें कि सीखना व्यक्तिगत, इंटरैक्टिव और यादगार हो।
-
-        बच्चे का नाम: {name}
-        सीखने की शैली: {learning_style}
-        भाषा: हिंदी
-
-        प्रश्न: {question}
-
-        उत्तर संरचना:
-        - अनुकूल और प्रोत्साहक स्वर का उपयोग करें (जैसे "शानदार प्रश्न!", "वाह, तुम जिज्ञासु हो!", "आइए इसे साथ मिलकर खोजें!")।
-        - उत्तर को सरल चरणों में तोड़ें।
-        - तकनीकी शब्दों से बचें; छोटे वाक्यों और बुलेट पॉइंट्स का उपयोग करें।
-        - मज़ेदार इमोजी, रंग या सरल चित्रण जोड़ें।
-        - बच्चे को शामिल करने के लिए प्रश्न पूछें या छोटी चुनौतियां दें।
-        - उदाहरण, एनालॉजी या मिनी गतिविधियां शामिल करें जो उनकी सीखने की शैली से मेल खाएं (Visual: चित्र, Auditory: कहानियां, Kinesthetic: व्यायाम)।
-        - हमेशा सकारात्मक, प्रेरक और सहायक रहें।
-        """
-    else:
-        prompt = f"""
-        You are a friendly, super helpful, and creative AI teacher designed especially for children aged 6–14. Your role is to explain concepts in an easy, fun, and visually engaging way. You will provide answers to any question the child asks, in a way that makes learning personalized, interactive, and memorable.
-
-        Child's name: {name}
-        Learning style: {learning_style}
-        Language: English
-
-        Question: {question}
-
-        Response Structure:
-        - Always speak like a kind mentor or favorite teacher.
-        - Use words like "Great question!", "Wow, you're curious!", "Let's explore this together!".
-        - Break down answers into simple steps.
-        - Avoid technical jargon; use short sentences and bullet points for clarity.
-        - Add fun emojis, colors, or simple illustrations (ASCII or descriptions).
-        - Ask questions back to engage the child or include small challenges/mini-quizzes.
-        - Include examples, analogies, or mini activities that fit their learning style (Visual: diagrams, Auditory: rhymes, Kinesthetic: exercises).
-        - Always be positive, motivating, and supportive.
-        """
-
-    import time  # For retries
-
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful AI study assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "timeout": 30  # Add timeout to prevent hanging
-    }
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                time.sleep(2)  # Wait before retry
-                continue
-            st.error("Request timed out. Please check your internet connection.")
-            return "Error: Request timed out. Try again."
-        except requests.exceptions.ConnectionError:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            st.error("Connection error. Please check your network or API status.")
-            return "Error: Connection failed. Check your internet or OpenRouter status."
-        except Exception as e:
-            st.error(f"⚠️ Error generating answer (Attempt {attempt + 1}): {str(e)}")
-            if "response" in locals():
-                st.write("Raw API response:", response.text)
-            return "Sorry, something went wrong. Please try again."
+    # Identical questions from the same kind of learner share one answer
+    history = history if history and is_follow_up(question) else None
+    model = get_config()["model"]  # The app's configured MODEL, first in the router's default chain
+    response_cache = get_response_cache()
+    cache_key = make_cache_key(question, language, "", "", model, mbti, learning_style, name)
+    cached = response_cache.get(cache_key) if history is None else None
+    if cached is not None:
+        return cached
+
+    # Static instructions first, so the provider can reuse the cached prompt prefix
+    messages, max_tokens = get_template(language, None, "personalized").render(
+        history, name=name, learning_style=learning_style, question=question)
+
+    try:
+        # A slow or failing model hands over to the next one in the chain
+        models = get_router().route(None, "", question, "personalized", model)
+        # Streamed even here, so the router's hedging and latency stats see a real first token
+        stream = get_router().stream(models, _personalized_start(API_KEY, messages, max_tokens))
+        with contextlib.closing(stream):
+            answer = "".join(chunk for _, chunk in stream).strip()
+        if history is None:
+            response_cache.set(cache_key, answer)
+        return answer
+    except BackpressureError:
+        return BUSY_MESSAGE
+    except (CircuitOpenError, AllModelsFailed):
+        # The end of the fallback chain is the offline responder
+        return get_knowledge_base().offline_answer(question, language=language) or OFFLINE_MESSAGE
+    except Exception as e:
+        st.error(f"⚠️ Error generating answer: {str(e)}")
+        return "Sorry, something went wrong. Please try again."
+
+
+def stream_personalized_answer(question, mbti, learning_style, language="en", name="", timer=None, history=None):
+    """Yield the answer in chunks as it streams in; same arguments as get_personalized_answer.
+
+    Pass a StreamTimer as `timer` to read time-to-first-token afterwards.
+    """
+    timer = timer or StreamTimer()
+    if not question.strip():
+        yield "Please enter a valid question."
+        return
+    query = preprocess(question)
+    if query.intent != "question":
+        yield local_reply(query.intent, language)
+        return
+    question = query.text
+
+    API_KEY = _get_api_key()
+    if API_KEY is None:
+        yield "Error: API key missing. Check your setup."
+        return
+
+    history = history if history and is_follow_up(question) else None
+    model = get_config()["model"]
+    response_cache = get_response_cache()
+    cache_key = make_cache_key(question, language, "", "", model, mbti, learning_style, name)
+    cached = response_cache.get(cache_key) if history is None else None
+    if cached is not None:
+        yield cached
+        return
+
+    messages, max_tokens = get_template(language, None, "personalized").render(
+        history, name=name, learning_style=learning_style, question=question)
+
+    # Retries and model fallback happen before the first chunk; once text has been shown we only report errors
+    answer = []
+    stream = get_router().stream(get_router().route(None, "", question, "personalized", model),
+                                 _personalized_start(API_KEY, messages, max_tokens))
+    try:
+        for _, delta in stream:
+            timer.mark_token()
+            answer.append(delta)
+            yield delta
+    except BackpressureError:
+        yield BUSY_MESSAGE
+        return
+    except (CircuitOpenError, AllModelsFailed):
+        yield get_knowledge_base().offline_answer(question, language=language) or OFFLINE_MESSAGE
+        return
+    except Exception as e:
+        if answer:
+            st.error(f"⚠️ The answer was interrupted: {str(e)}")
+            yield "\n\n_(The answer was cut short. Please try again.)_"
+        elif isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            st.error(f"Could not reach the tutor service: {str(e)}")
+            yield "Error: Connection failed. Check your internet or OpenRouter status."
+        else:
+            st.error(f"⚠️ Error generating answer: {str(e)}")
+            yield "Sorry, something went wrong. Please try again."
+        return
+    finally:
+        stream.close()  # Lets the shared upstream call stop if nobody else is listening
+    timer.finish()
+    # Same cached value as get_personalized_answer, which strips its answers
+    if "".join(answer).strip() and history is None:
+        response_cache.set(cache_key, "".join(answer).strip())
@@ -0,0 +1,126 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from coordinator import API_BURST, API_MAX_WAITING
+
+JOBS_PER_SESSION = int(os.getenv("JOBS_PER_SESSION", 2))
+REQUESTS_PER_JOB = 3  # An answer's explanation, quiz and video are requested at once
+# Jobs wait on the network, so run as many as the rate limiter can hold - a burst plus its queue of
+# waiters. More would only be turned away as busy; those wait here instead, shown as queued.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", max(8, (API_BURST + API_MAX_WAITING) // REQUESTS_PER_JOB)))
+FINISHED_JOB_TTL = 600  # Seconds a finished job waits to be picked up before it is dropped
+
+
+class JobLimitError(Exception):
+    """Raised when a session already has its maximum number of jobs in flight."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that noticed it was cancelled."""
+
+
+class Job:
+    """A unit of background work plus the state the UI polls."""
+
+    def __init__(self, job_id, session_id):
+        self.id = job_id
+        self.session_id = session_id
+        self.status = "queued"  # queued -> running -> done / failed / cancelled
+        self.progress = {}  # Partial results the worker publishes for live display
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobQueue:
+    """Process-wide worker pool for slow calls, with a cap on jobs per session."""
+
+    def __init__(self, max_workers=JOB_WORKERS, per_session=JOBS_PER_SESSION):
+        self.per_session = per_session
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, fn, *args, **kwargs):
+        """Run fn(job, *args, **kwargs) in the background and return the job id."""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if job.session_id == session_id and not job.finished)
+            if active >= self.per_session:
+                raise JobLimitError(f"{active} jobs already running for this session")
+            job = Job(f"job-{next(self._ids)}", session_id)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status, job.finished_at = "cancelled", time.time()
+            return
+        job.status = "running"
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        """How many queued jobs are ahead of a queued job (0 = next to start), or None once it runs."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return None
+            ahead = 0
+            for other in self._jobs.values():
+                if other is job:
+                    return ahead
+                if other.status == "queued" and not other.cancel_event.is_set():
+                    ahead += 1
+        return None
+
+    def cancel(self, job_id):
+        """Ask a job to stop; a queued job never starts, a running one stops at its next check."""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        # Jobs whose session went away are never picked up; don't keep them forever
+        cutoff = time.time() - FINISHED_JOB_TTL
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+@st.cache_resource
+def get_job_queue():
+    """Job queue shared by every Streamlit session in this process."""
+    return JobQueue()
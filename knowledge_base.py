@@ -0,0 +1,214 @@
+"""Local bilingual knowledge base with a BM25 index for offline and first-tier answers.
+
+Content lives in content/*.jsonl, one entry per line:
+    {"id": ..., "subject": ..., "grades": [min, max], "topic": ...,
+     "keywords": [...], "en": "English answer", "hi": "Hindi answer"}
+
+Rebuild the prebuilt index after editing content with:
+    python -m knowledge_base build
+"""
+import glob
+import json
+import math
+import os
+import pickle
+import sys
+from collections import Counter, defaultdict
+
+import streamlit as st
+
+from response_cache import normalize_question
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+INDEX_PATH = os.path.join(CONTENT_DIR, "index.pickle")
+INDEX_VERSION = 1
+
+# An offline answer needs half of the question's terms to match; answering
+# instead of the LLM needs all of them and a clearly relevant entry
+OFFLINE_MIN_COVERAGE = 0.5
+DIRECT_MIN_SCORE = float(os.getenv("KB_DIRECT_MIN_SCORE", 3.0))
+DIRECT_MIN_COVERAGE = 1.0
+
+# Sidebar language labels -> content keys
+LANGUAGE_CODES = {"English": "en", "हिंदी (Hindi)": "hi", "en": "en", "hi": "hi"}
+
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did of in on at to for from by with and or
+what whats which who whom whose why how when where can could should would will shall
+me my i you your we our us it its this that these those please tell explain about
+give define meaning mean
+क्या है हैं था थे हो होता होती होते का की के को में से पर और या भी यह वह ये वे
+कौन कैसे क्यों कब कहाँ कहां मुझे हमें बताओ बताइए समझाओ समझाइए किसे कहते
+""".split())
+
+
+def language_code(language):
+    return LANGUAGE_CODES.get(language, "en")
+
+
+def tokenize(text):
+    """Split normalized text into index terms; handles Devanagari and simple English plurals."""
+    tokens = []
+    for token in normalize_question(text).split():
+        if token in STOPWORDS:
+            continue
+        if token.isascii() and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]  # plants -> plant
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> [(doc_id, term_frequency)]."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        for doc_id, tokens in enumerate(documents):
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings[term].append((doc_id, freq))
+        self.postings = dict(self.postings)
+        count = len(self.doc_lengths) or 1
+        self.avg_length = sum(self.doc_lengths) / count or 1.0
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, terms):
+        """Return {doc_id: (score, number of distinct query terms matched)}."""
+        scores = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                score, matched = scores.get(doc_id, (0.0, 0))
+                scores[doc_id] = (score + idf * freq * (self.k1 + 1) / (freq + norm), matched + 1)
+        return scores
+
+
+def _fits(entry, subject, grade):
+    """Whether an entry was written for this subject and grade (either may be None for any)."""
+    if subject and entry.get("subject") != subject:
+        return False
+    low, high = entry.get("grades", [1, 12])
+    return grade is None or low <= int(grade) <= high
+
+
+class KnowledgeBase:
+    """Content entries plus their BM25 index."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.index = BM25Index([self._document_tokens(entry) for entry in entries])
+
+    @staticmethod
+    def _document_tokens(entry):
+        # Topic and keywords are what students actually ask about, so weight them up
+        key_text = " ".join([entry.get("topic", "")] + entry.get("keywords", []))
+        return tokenize(key_text) * 3 + tokenize(entry.get("en", "")) + tokenize(entry.get("hi", ""))
+
+    @classmethod
+    def from_directory(cls, content_dir=CONTENT_DIR):
+        entries = []
+        for path in sorted(glob.glob(os.path.join(content_dir, "*.jsonl"))):
+            with open(path, encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+        return cls(entries)
+
+    def search(self, question, subject=None, grade=None, top_k=3):
+        """Return up to top_k (score, coverage, entry) matches, best first.
+
+        coverage is the share of the question's terms that the entry matched.
+        Entries for the current subject and grade are ranked slightly higher.
+        """
+        terms = tokenize(question)
+        if not terms:
+            return []
+        distinct = len(set(terms))
+        results = []
+        for doc_id, (score, matched) in self.index.search(terms).items():
+            entry = self.entries[doc_id]
+            if subject and entry.get("subject") == subject:
+                score *= 1.2
+            low, high = entry.get("grades", [1, 12])
+            if grade is not None and low <= int(grade) <= high:
+                score *= 1.1
+            results.append((score, matched / distinct, entry))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:top_k]
+
+    def answer(self, question, subject=None, grade=None, language="English",
+               min_score=1.0, min_coverage=0.0, strict=False):
+        """Best matching answer text in the student's language, or None.
+
+        With strict, only entries written for this subject and grade count.
+        """
+        results = self.search(question, subject, grade, top_k=3 if strict else 1)
+        if strict:
+            results = [result for result in results if _fits(result[2], subject, grade)]
+        for score, coverage, entry in results[:1]:
+            if score >= min_score and coverage >= min_coverage:
+                return entry.get(language_code(language)) or entry.get("en")
+        return None
+
+    def offline_answer(self, question, subject=None, grade=None, language="English"):
+        return self.answer(question, subject, grade, language, min_coverage=OFFLINE_MIN_COVERAGE)
+
+    def direct_answer(self, question, subject=None, grade=None, language="English"):
+        """Answer good enough to serve without calling the LLM at all.
+
+        Only an entry for the student's subject and grade qualifies; anything
+        else is left to the LLM, which writes for the right level.
+        """
+        return self.answer(question, subject, grade, language,
+                           min_score=DIRECT_MIN_SCORE, min_coverage=DIRECT_MIN_COVERAGE, strict=True)
+
+    def save(self, path=INDEX_PATH):
+        # Plain data only, so the file loads no matter which module name built it
+        state = {"version": INDEX_VERSION, "entries": self.entries, "index": vars(self.index)}
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError("Knowledge base index was built by another version")
+        kb = cls.__new__(cls)
+        kb.entries = state["entries"]
+        kb.index = BM25Index.__new__(BM25Index)
+        kb.index.__dict__.update(state["index"])
+        return kb
+
+
+def load_knowledge_base(content_dir=CONTENT_DIR, index_path=INDEX_PATH):
+    """Load the prebuilt index if it is newer than the content, else build it from the files."""
+    sources = glob.glob(os.path.join(content_dir, "*.jsonl"))
+    newest_source = max((os.path.getmtime(path) for path in sources), default=0)
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= newest_source:
+        try:
+            return KnowledgeBase.load(index_path)
+        except (OSError, ValueError, KeyError, EOFError, pickle.UnpicklingError):
+            pass  # Stale or corrupt index - rebuild below
+    return KnowledgeBase.from_directory(content_dir)
+
+
+@st.cache_resource
+def get_knowledge_base():
+    """Process-wide knowledge base, built once at startup."""
+    return load_knowledge_base()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("usage: python -m knowledge_base build")
+    kb = KnowledgeBase.from_directory()
+    kb.save()
+    print(f"Indexed {len(kb.entries)} entries, {len(kb.index.postings)} terms -> {INDEX_PATH}")
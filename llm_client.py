@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+from metrics import get_metrics
+from retry import CircuitBreaker, RetryPolicy, call_with_retry
+
+API_BASE = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 60))
+
+# Total time a student may wait for a completion to start, retries included
+DEFAULT_RETRY_POLICY = RetryPolicy(
+    max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", 3)),
+    deadline=float(os.getenv("RETRY_DEADLINE", 30)),
+)
+
+
+@st.cache_resource
+def get_session():
+    """Process-wide pooled HTTP session, so sessions reuse keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def chat_completion(api_key, payload, stream=False, read_timeout=None, connect_timeout=None):
+    """POST a chat completion through the shared session and return the response."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    timeout = (connect_timeout or CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT)
+    return get_session().post(
+        f"{API_BASE}/chat/completions",
+        headers=headers,
+        json=payload,
+        timeout=timeout,
+        stream=stream
+    )
+
+
+@st.cache_resource
+def get_circuit_breaker(model=None):
+    """Process-wide breaker per model, so an outage seen by one session spares the others."""
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30)),
+    )
+
+
+def send_chat_completion(api_key, payload, stream=False, read_timeout=None, policy=None):
+    """chat_completion() with retries, a total deadline and the model's shared circuit breaker.
+
+    Raises retry.CircuitOpenError while the breaker is open; callers should
+    try another model or use their offline path then.
+    """
+    read_timeout = read_timeout or READ_TIMEOUT
+
+    def send(remaining):
+        # Never let a single attempt outlive the overall deadline
+        return chat_completion(
+            api_key, payload, stream=stream,
+            read_timeout=min(read_timeout, remaining),
+            connect_timeout=min(CONNECT_TIMEOUT, remaining),
+        )
+
+    return call_with_retry(send, policy or DEFAULT_RETRY_POLICY, get_circuit_breaker(payload.get("model")))
+
+
+class HealthMonitor:
+    """Probe the API's /models endpoint in the background and cache the result."""
+
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self._status = {"reachable": None, "latency": None, "checked_at": None, "error": None}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="api-health-check", daemon=True)
+        self._thread.start()
+
+    def status(self):
+        """Last known status; never blocks. `reachable` is None until the first probe ends."""
+        with self._lock:
+            return dict(self._status)
+
+    def check_now(self):
+        """Ask the background thread to probe again, e.g. after a failed request."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._probe()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _probe(self):
+        started = time.perf_counter()
+        try:
+            response = get_session().get(f"{API_BASE}/models", timeout=(CONNECT_TIMEOUT, 10))
+            reachable, error = response.ok, None if response.ok else f"HTTP {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            reachable, error = False, type(e).__name__
+        get_metrics().observe("probe", time.perf_counter() - started)
+        if error is not None:
+            get_metrics().incr("probe_failures", type=error)
+        with self._lock:
+            self._status = {
+                "reachable": reachable,
+                "latency": time.perf_counter() - started,
+                "checked_at": time.time(),
+                "error": error,
+            }
+
+
+@st.cache_resource
+def get_health_monitor():
+    """Start the shared background health check once per process."""
+    return HealthMonitor()
+
+
+def api_status():
+    return get_health_monitor().status()
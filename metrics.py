@@ -0,0 +1,211 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import streamlit as st
+
+# Seconds; roughly Prometheus' default buckets stretched to cover slow completions
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+RESERVOIR_SIZE = 1024  # Recent observations kept per series for live percentiles
+PROM_WRITE_INTERVAL = 15  # Seconds between rewrites of the Prometheus textfile
+PREFIX = "learningbuddy"
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative bucket counts for export plus a reservoir of recent values for percentiles."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+    def percentiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {"p50": None, "p95": None, "p99": None}
+        pick = lambda fraction: values[min(len(values) - 1, int(fraction * len(values)))]
+        return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+class Trace:
+    """Timings and outcome of one question; written as a JSONL line when finished."""
+
+    def __init__(self, metrics, **fields):
+        self.metrics = metrics
+        self.fields = {"trace_id": uuid.uuid4().hex, "started_at": time.time(), **fields}
+        self.stages = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        """Time a block as a stage of this question and of the process-wide histograms."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, **labels)
+
+    def record(self, name, seconds, **labels):
+        self.stages[name] = round(self.stages.get(name, 0) + seconds, 6)
+        self.metrics.observe(name, seconds, **labels)
+
+    def finish(self, source, error=None, **fields):
+        """Close the trace: total time, outcome counters and the JSONL export."""
+        total = time.perf_counter() - self._started
+        self.metrics.observe("total", total, source=source)
+        self.metrics.incr("questions", source=source)
+        if error is not None:
+            self.metrics.incr("errors", type=error)
+        self.fields.update(fields, source=source, error=error, total=round(total, 6), stages=self.stages)
+        self.metrics.write_trace(self.fields)
+
+
+class Metrics:
+    """In-process stage histograms and counters, exportable as Prometheus text or JSONL traces."""
+
+    def __init__(self, trace_path=None, prom_path=None):
+        self.trace_path = trace_path
+        self.prom_path = prom_path
+        self._histograms = {}  # (stage, label key) -> Histogram
+        self._counters = {}  # (name, label key) -> value
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._prom_written = 0.0
+
+    def observe(self, stage, seconds, **labels):
+        if seconds is None:
+            return
+        key = (stage, _label_key(labels))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(seconds)
+
+    def incr(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextlib.contextmanager
+    def time(self, stage, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def trace(self, **fields):
+        return Trace(self, **fields)
+
+    def snapshot(self):
+        """Stage percentiles and counters, for the admin page."""
+        with self._lock:
+            stages = [
+                {"stage": stage, **dict(labels), "count": histogram.count,
+                 "mean": histogram.sum / histogram.count, **histogram.percentiles()}
+                for (stage, labels), histogram in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"counter": name, **dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"stages": stages, "counters": counters}
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+        with self._lock:
+            for (stage, labels), histogram in sorted(self._histograms.items()):
+                key = (("stage", stage),) + labels
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(f"{PREFIX}_stage_seconds_bucket{_format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{PREFIX}_stage_seconds_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{PREFIX}_stage_seconds_sum{_format_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}_stage_seconds_count{_format_labels(key)} {histogram.count}")
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter == name:
+                        lines.append(f"{PREFIX}_{name}_total{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_trace(self, fields):
+        """Append a trace to the JSONL file and refresh the Prometheus textfile, if configured."""
+        if self.trace_path:
+            with self._file_lock:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        if self.prom_path and time.monotonic() - self._prom_written >= PROM_WRITE_INTERVAL:
+            self._prom_written = time.monotonic()
+            # Write-then-rename, so a scraper never reads half a file
+            with self._file_lock:
+                with open(self.prom_path + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(self.prometheus())
+                os.replace(self.prom_path + ".tmp", self.prom_path)
+
+
+@st.cache_resource
+def get_metrics():
+    """Metrics shared by every Streamlit session in this process.
+
+    METRICS_TRACE_PATH enables JSONL traces; METRICS_PROM_PATH enables a
+    Prometheus textfile (e.g. for node_exporter's textfile collector).
+    """
+    for path in (os.getenv("METRICS_TRACE_PATH"), os.getenv("METRICS_PROM_PATH")):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    return Metrics(os.getenv("METRICS_TRACE_PATH"), os.getenv("METRICS_PROM_PATH"))
+
+
+def _milliseconds(row):
+    return {key: round(value * 1000, 1) if key in ("mean", "p50", "p95", "p99") and value is not None else value
+            for key, value in row.items()}
+
+
+def render_admin_page(extra_stats=None):
+    """Live percentiles and counters; app.py shows this only with the admin token.
+
+    extra_stats maps a title to a callable returning a dict, for other
+    components' stats (cache, router, coordinator).
+    """
+    st.title("📊 LearningBuddy metrics")
+    metrics = get_metrics()
+
+    @st.fragment(run_every=2)
+    def live():
+        snapshot = metrics.snapshot()
+        st.subheader("Stage latency (ms)")
+        st.dataframe([_milliseconds(row) for row in snapshot["stages"]])
+        st.subheader("Counters")
+        st.dataframe(snapshot["counters"])
+        for title, stats in (extra_stats or {}).items():
+            st.subheader(title)
+            st.json(stats())
+
+    live()
+    st.download_button("Download Prometheus metrics", metrics.prometheus(), file_name="learningbuddy.prom")
@@ -0,0 +1,390 @@
+import contextlib
+import os
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+
+from conversation import has_own_topic, is_follow_up
+from coordinator import BackpressureError, get_coordinator, request_key
+from jobs import JOB_WORKERS, REQUESTS_PER_JOB, JobCancelled
+from knowledge_base import get_knowledge_base, language_code
+from llm_client import send_chat_completion, api_status, get_health_monitor
+from metrics import get_metrics
+from prompts import get_template
+from quiz_bank import get_quiz_bank, quiz_topic, QUIZ_SIZE
+from quiz_parser import QuizStreamParser
+from response_cache import get_response_cache, make_cache_key
+from retry import CircuitOpenError, RetryPolicy
+from router import AllModelsFailed, get_router
+from streaming import iter_stream_deltas, StreamTimer
+
+
+class Part:
+    """One independently generated piece of an answer, with its own time budget."""
+
+    def __init__(self, name, timeout):
+        self.name = name
+        self.timeout = timeout  # Total seconds from submission to the last token; the part is stopped after that
+
+
+PART_STOP_GRACE = 1.0  # Seconds past a part's deadline before it is stopped from outside
+
+PARTS = {
+    "explanation": Part("explanation", 45),
+    "quiz": Part("quiz", 40),
+    "video": Part("video", 15),
+}
+
+
+class PartTimeout(Exception):
+    """Raised by stream_part when a part runs past its Part.timeout."""
+
+
+class PartStop:
+    """Stop signal for one part: set by hand, by its deadline passing or by the job being cancelled.
+
+    Quacks like threading.Event as far as ModelRouter.stream is concerned.
+    """
+
+    def __init__(self, part, cancel_event=None):
+        self.deadline = time.monotonic() + PARTS[part].timeout
+        self.cancel_event = cancel_event
+        self._event = threading.Event()
+
+    def set(self):
+        self._event.set()
+
+    def is_set(self):
+        return (self._event.is_set() or time.monotonic() >= self.deadline
+                or (self.cancel_event is not None and self.cancel_event.is_set()))
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+
+def build_prompt(part, question, language, subject, grade, history=None):
+    """(messages, max_tokens) for one part of the answer; history comes from ConversationContext.messages."""
+    return get_template(language, grade, part).render(history, subject=subject, grade=grade, question=question)
+
+
+def stream_part(api_key, models, part, prompt, on_delta=None, quiz_parser=None, cancel_event=None, stop=None):
+    """Stream one part to completion and return (text, timer); prompt comes from build_prompt.
+
+    models is the chain from ModelRouter.route: later models take over when
+    earlier ones fail or stall before their first token. Runs on worker
+    threads, so it must not touch st.session_state or draw anything;
+    on_delta is how callers get partial text. Setting cancel_event (the
+    job's) closes the stream and raises JobCancelled, so no more tokens are
+    paid for; past the part's timeout, or once stop is set by hand, it
+    raises PartTimeout instead.
+    """
+    spec = PARTS[part]
+    stop = stop or PartStop(part, cancel_event)
+    messages, max_tokens = prompt
+    timer = StreamTimer()
+
+    def start(model, stop):
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        policy = RetryPolicy(max_attempts=3, deadline=spec.timeout)
+
+        def produce(flight_stop):
+            response = send_chat_completion(api_key, payload, stream=True, read_timeout=spec.timeout, policy=policy)
+            with response:
+                for delta in iter_stream_deltas(response):
+                    if flight_stop.is_set():
+                        return
+                    yield delta
+
+        # Identical requests from other sessions share this one upstream call
+        return get_coordinator().stream(request_key(payload), produce, stop)
+
+    text = ""
+    parse_seconds = 0.0
+    stream = get_router().stream(models, start, stop)
+    with contextlib.closing(stream):
+        for _, delta in stream:
+            timer.mark_token()
+            text += delta
+            if quiz_parser is not None:
+                parse_started = time.perf_counter()
+                quiz_parser.feed(delta)
+                parse_seconds += time.perf_counter() - parse_started
+            if on_delta is not None:
+                on_delta(text)
+    if stop.cancelled:
+        raise JobCancelled()
+    if stop.is_set():
+        raise PartTimeout(f"the {part} took longer than {spec.timeout}s")
+    if quiz_parser is not None:
+        parse_started = time.perf_counter()
+        quiz_parser.close()
+        get_metrics().observe("quiz_parse", parse_seconds + time.perf_counter() - parse_started)
+    timer.finish()
+    get_metrics().observe("ttft", timer.ttft, part=part)
+    get_metrics().observe("completion", timer.total, part=part)
+    return text, timer
+
+
+def submit_parts(api_key, model, parts, question, language, subject, grade, quiz_parser=None, cancel_event=None,
+                 history=None):
+    """Start the given parts concurrently on the shared pool; returns {part: (Future, PartStop)}."""
+    executor = get_executor()
+    submitted = {}
+    for part in parts:
+        stop = PartStop(part, cancel_event)  # The timeout runs from here, not from when a worker picks it up
+        future = executor.submit(
+            stream_part, api_key, get_router().route(grade, subject, question, part, model), part,
+            build_prompt(part, question, language, subject, grade, history),
+            quiz_parser=quiz_parser if part == "quiz" else None,
+            stop=stop,
+        )
+        submitted[part] = (future, stop)
+    return submitted
+
+
+BUSY_MESSAGES = {
+    "en": "Lots of students are asking questions right now! Please wait a few seconds and ask again. ⏳",
+    "hi": "अभी बहुत सारे विद्यार्थी प्रश्न पूछ रहे हैं! कृपया कुछ सेकंड रुककर फिर से पूछें। ⏳",
+}
+
+
+def get_offline_response(question, subject, grade, language):
+    """Answer from the local knowledge base when the API is not accessible."""
+    answer = get_knowledge_base().offline_answer(question, subject, grade, language)
+    if answer:
+        return answer
+    if language_code(language) == "hi":
+        return f"मैं अभी ऑफ़लाइन मोड में हूँ और विस्तार से उत्तर नहीं दे सकता। कृपया इंटरनेट कनेक्शन होने पर फिर से प्रयास करें। तब तक आप YouTube पर इस विषय के शैक्षिक वीडियो देख सकते हैं: '{question}'"
+    return f"I'm currently in offline mode and can't provide detailed answers. Please try again when you have internet connection. For now, I can suggest watching educational videos on YouTube about your topic: '{question}'"
+
+
+def answer_question(job, question, language, subject, grade, api_key, model, history=None):
+    """Produce the full answer to a student's question; runs as a background job.
+
+    history is the conversation so far, from ConversationContext.messages. It
+    is only sent for follow-up questions, so standalone questions keep hitting
+    the shared cache and coalescing with other students' identical requests.
+
+    Partial text is published in job.progress ("explanation", "video",
+    "quiz_count") for the UI to poll. Returns a dict with the final "text",
+    "quiz_questions", the quiz bank "topic", "ttft", the "source" of the text
+    (cache, knowledge_base, llm, offline, busy or error) and "notices" - (kind,
+    message) pairs the UI shows with st.warning / st.error / st.toast / st.info.
+    """
+    notices = []
+    quiz_parser = QuizStreamParser()
+    quiz_bank = get_quiz_bank()
+    history = history if history and is_follow_up(question) else None
+    trace = get_metrics().trace(subject=subject, grade=grade, language=language_code(language),
+                                follow_up=history is not None)
+    # "Explain that again" banks its quiz under the topic it refers back to; a question naming its own doesn't
+    topic_question = question if has_own_topic(question) else next(
+        (message["content"] for message in reversed(history or []) if message["role"] == "user"), question)
+    quiz_slot = (subject, grade, language_code(language), quiz_topic(topic_question, subject, grade))
+    ttft = None
+    source, error = "llm", None
+
+    try:
+        # Serve repeated classroom questions straight from the cache
+        response_cache = get_response_cache()
+        cache_key = make_cache_key(question, language, subject, grade, model)
+        with trace.stage("cache_lookup"):
+            text = response_cache.get(cache_key) if history is None else None
+        get_metrics().incr("cache_lookups", result="miss" if text is None else "hit")
+
+        local_answer = None
+        if text is None and history is None:
+            with trace.stage("knowledge_base"):
+                local_answer = get_knowledge_base().direct_answer(question, subject, grade, language)
+
+        if text is not None or local_answer is not None:
+            if text is not None:
+                source = "cache"
+                with trace.stage("quiz_parse"):
+                    quiz_parser.feed(text)
+                    quiz_parser.close()
+            else:
+                # Common questions are answered from the local knowledge base with no network call
+                source, text = "knowledge_base", local_answer
+            if (not quiz_parser.questions and quiz_bank.count(*quiz_slot) < QUIZ_SIZE
+                    and api_status()["reachable"] is not False):
+                # The text needs no LLM, but the quiz bank is too thin to build a quiz from
+                job.progress["explanation"] = text
+                _generate_quiz(job, question, language, subject, grade, api_key, model, quiz_parser, notices,
+                               history, trace)
+        elif api_status()["reachable"] is False:
+            # The background health check says we are offline - don't wait on a timeout
+            source = "offline"
+            text = get_offline_response(question, subject, grade, language)
+            notices.append(("warning", "🔄 Using offline mode - some features may be limited"))
+        else:
+            text, ttft = _generate(job, question, language, subject, grade, api_key, model,
+                                   quiz_parser, quiz_bank.count(*quiz_slot) < QUIZ_SIZE, notices, history, trace)
+            if ttft is not None and history is None:  # A follow-up's answer depends on its conversation
+                response_cache.set(cache_key, text)
+
+    except JobCancelled:
+        trace.finish("cancelled")
+        raise
+    except BackpressureError as e:
+        # Classroom burst: tell the student plainly instead of failing with a 429
+        source, error = "busy", type(e).__name__
+        text = BUSY_MESSAGES[language_code(language)]
+        notices.append(("warning", "🚦 " + BUSY_MESSAGES[language_code(language)]))
+    except (CircuitOpenError, AllModelsFailed) as e:
+        # Every model in the chain failed - the last fallback is the offline responder
+        source, error = "offline", type(e).__name__
+        get_health_monitor().check_now()
+        text = get_offline_response(question, subject, grade, language)
+        notices.append(("warning", "🔄 The tutor service is having trouble - using offline mode for now"))
+    except requests.exceptions.ConnectionError as e:
+        error = type(e).__name__
+        get_health_monitor().check_now()
+        if "NameResolutionError" in str(e) or "Name or service not known" in str(e):
+            source = "offline"
+            text = get_offline_response(question, subject, grade, language)
+            notices.append(("warning", "🔄 Using offline mode - some features may be limited"))
+        else:
+            source = "error"
+            text = f"🔌 Connection Error: {str(e)}"
+            notices.append(("error", text))
+    except requests.exceptions.RequestException as e:
+        source, error = "error", type(e).__name__
+        text = f"🚫 Network Error: {str(e)}"
+        notices.append(("error", text))
+    except Exception as e:
+        source, error = "error", type(e).__name__
+        text = f"❌ Unexpected Error: {str(e)}"
+        notices.append(("error", text))
+
+    # Bank any new quiz questions; otherwise assemble a quiz from the bank
+    with trace.stage("quiz_bank"):
+        # A copy: the parser's list belongs to the part that filled it
+        quiz_questions = list(quiz_parser.questions)
+        if quiz_questions:
+            question_ids = quiz_bank.add_questions(quiz_questions, *quiz_slot)
+            for quiz_question, question_id in zip(quiz_questions, question_ids):
+                quiz_question["id"] = question_id
+        else:
+            quiz_questions = quiz_bank.build_quiz(*quiz_slot)
+
+    trace.finish(source, error, ttft=ttft, response_chars=len(text), quiz_questions=len(quiz_questions))
+    return {"text": text, "quiz_questions": quiz_questions, "topic": quiz_slot[3], "ttft": ttft, "source": source,
+            "notices": notices}
+
+
+def _generate(job, question, language, subject, grade, api_key, model, quiz_parser, include_quiz, notices,
+              history=None, trace=None):
+    """Call the LLM for the explanation, video and (optionally) quiz parts concurrently.
+
+    The wait is the slowest part rather than the sum of all of them, and a
+    failed part doesn't lose the others. Returns (text, ttft); ttft is None
+    when the explanation failed, so the text must not be cached.
+    """
+    trace = trace or get_metrics().trace()
+    background_parts = ["video"] + (["quiz"] if include_quiz else [])
+    with trace.stage("prompt_build"):
+        parts = submit_parts(api_key, model, background_parts, question, language, subject, grade,
+                             quiz_parser=quiz_parser, cancel_event=job.cancel_event, history=history)
+        models = get_router().route(grade, subject, question, "explanation", model)
+        prompt = build_prompt("explanation", question, language, subject, grade, history)
+    job.progress["quiz_count"] = 0
+
+    def publish(partial):
+        job.progress["explanation"] = partial
+        job.progress["quiz_count"] = len(quiz_parser.questions)
+        video = parts["video"][0]
+        if "video" not in job.progress and video.done() and video.exception() is None:
+            job.progress["video"] = video.result()[0].strip()
+
+    try:
+        explanation, timer = stream_part(api_key, models, "explanation", prompt,
+                                         on_delta=publish, cancel_event=job.cancel_event)
+        explanation_error = None
+    except JobCancelled:
+        for future, stop in parts.values():
+            future.cancel()
+            stop.set()
+        raise
+    except Exception as e:
+        explanation, timer, explanation_error = "", None, e
+
+    with trace.stage("parts_wait"):
+        results = _collect_parts(parts, notices)
+    job.check_cancelled()
+    job.progress["quiz_count"] = len(quiz_parser.questions)
+
+    if explanation_error is not None and not any(results.values()):
+        raise explanation_error  # Nothing usable - report it like any other failure
+    if explanation_error is not None:
+        get_metrics().incr("part_failures", part="explanation", type=type(explanation_error).__name__)
+        explanation = "😕 I couldn't finish the explanation this time, but here is what I have for you."
+    text = "\n\n".join(part_text for part_text in [explanation, results.get("video", "")] if part_text)
+    if explanation_error is not None:
+        return text, None
+
+    # Show toast if response was slow (indicates potential network issues)
+    if timer.total > 10:
+        notices.append(("toast", "⏳ The server took a bit longer, but here's your answer!"))
+    return text, timer.ttft
+
+
+def _generate_quiz(job, question, language, subject, grade, api_key, model, quiz_parser, notices, history=None,
+                   trace=None):
+    """Call the LLM for the quiz part alone, for answers that came from the cache or knowledge base."""
+    trace = trace or get_metrics().trace()
+    with trace.stage("prompt_build"):
+        parts = submit_parts(api_key, model, ["quiz"], question, language, subject, grade,
+                             quiz_parser=quiz_parser, cancel_event=job.cancel_event, history=history)
+    with trace.stage("parts_wait"):
+        _collect_parts(parts, notices)
+    job.check_cancelled()
+    job.progress["quiz_count"] = len(quiz_parser.questions)
+
+
+def _collect_parts(parts, notices):
+    """Wait for submitted parts; returns {part: text} for those that finished, with a notice for the rest.
+
+    Parts stop themselves at their deadline. One still running a moment
+    later (e.g. queued behind other work) is stopped here and given up on.
+    """
+    results = {}
+    deadline = max(stop.deadline for _, stop in parts.values()) + PART_STOP_GRACE
+    done = concurrent.futures.wait([future for future, _ in parts.values()],
+                                   timeout=max(0, deadline - time.monotonic())).done
+    for part, (future, stop) in parts.items():
+        if future not in done:
+            future.cancel()
+            stop.set()  # No more tokens paid for, and no more quiz questions appended behind our back
+            get_metrics().incr("part_failures", part=part, type="Timeout")
+            notices.append(("toast", f"⚠️ The {part} took too long this time"))
+            continue
+        try:
+            results[part] = future.result()[0].strip()
+        except PartTimeout:
+            get_metrics().incr("part_failures", part=part, type="Timeout")
+            notices.append(("toast", f"⚠️ The {part} took too long this time"))
+        except Exception as e:
+            get_metrics().incr("part_failures", part=part, type=type(e).__name__)
+            notices.append(("toast", f"⚠️ Couldn't prepare the {part} this time ({type(e).__name__})"))
+    return results
+
+
+@st.cache_resource
+def get_executor():
+    """Process-wide worker pool for answer parts; every running job may have its quiz and video in flight."""
+    return ThreadPoolExecutor(
+        max_workers=int(os.getenv("PIPELINE_WORKERS", JOB_WORKERS * (REQUESTS_PER_JOB - 1))),
+        thread_name_prefix="answer-part",
+    )
@@ -0,0 +1,194 @@
+"""Pre-generate answers and quizzes for a term's syllabus.
+
+Every topic is asked for each language x subject x grade combination
+through the same pipeline the app uses. Answers are pinned in the response
+cache (ttl=0) and quiz questions go into the quiz bank, which is where the
+app looks before calling the API.
+
+Topics come from a CSV file with a header row or from JSONL. The fields are:
+    question   the topic question, asked in every language
+    en, hi     per-language wording that overrides question (Hindi students type Hindi)
+    subject    one subject; default: every subject in the sidebar
+    grades     "6", "6-8", "1,3,5" or [min, max]; default: grades 1-12
+
+Run from the repository root, with the same MODEL and cache settings as the app:
+    python -m precompute syllabus.csv --workers 4 --rate 2
+
+Each finished item is appended to a checkpoint file. An interrupted run
+resumes where it stopped, and failed items are tried again on the next run.
+Raise RESPONSE_CACHE_MAX_MB if the syllabus is larger than the cache.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from prompts import GRADES, LANGUAGES, SUBJECTS
+
+DEFAULT_CHECKPOINT = os.path.join(".cache", "precompute.checkpoint")
+RETRY_BACKOFF = 5  # Seconds before retrying a busy item; doubles per attempt
+
+
+def parse_grades(value):
+    if value in (None, ""):
+        return GRADES
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, list):
+        return list(range(int(value[0]), int(value[-1]) + 1))
+    grades = []
+    for part in str(value).split(","):
+        low, _, high = part.strip().partition("-")
+        grades.extend(range(int(low), int(high or low) + 1))
+    return grades
+
+
+def read_topics(path):
+    """Rows of the topic file as dicts."""
+    with open(path, encoding="utf-8-sig") as f:
+        if path.endswith((".jsonl", ".json")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def expand(rows, languages, subjects, grades):
+    """(language, subject, grade, question) items for every row, restricted to the given choices."""
+    items = []
+    for number, row in enumerate(rows, 1):
+        row_subjects = [row["subject"]] if row.get("subject") else SUBJECTS
+        unknown = [subject for subject in row_subjects if subject not in SUBJECTS]
+        if unknown:
+            print(f"Skipping row {number}: unknown subject {unknown[0]!r}", file=sys.stderr)
+            continue
+        try:
+            row_grades = parse_grades(row.get("grades"))
+        except ValueError:
+            print(f"Skipping row {number}: bad grades {row.get('grades')!r}", file=sys.stderr)
+            continue
+        for language in languages:
+            question = (row.get("hi") if "Hindi" in language else row.get("en")) or row.get("question")
+            if not question:
+                continue
+            for subject in row_subjects:
+                if subject in subjects:
+                    items.extend((language, subject, grade, question.strip())
+                                 for grade in row_grades if grade in grades)
+    return items
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", help="CSV or JSONL topic list")
+    parser.add_argument("--workers", type=int, default=4, help="questions in flight at once")
+    parser.add_argument("--rate", type=float, default=2, help="upstream API requests per second")
+    parser.add_argument("--retries", type=int, default=3, help="attempts per item while the API is busy")
+    parser.add_argument("--max-failures", type=int, default=20, help="stop after this many failed items")
+    parser.add_argument("--language", action="append", choices=LANGUAGES, help="only this language (repeatable)")
+    parser.add_argument("--subject", action="append", choices=SUBJECTS, help="only this subject (repeatable)")
+    parser.add_argument("--grades", help='only these grades, e.g. "6-8"')
+    parser.add_argument("--model", default=None, help="model to generate with; default: MODEL, as in the app")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--dry-run", action="store_true", help="list the work without calling the API")
+    args = parser.parse_args()
+
+    # A batch job should wait its turn at the rate limiter instead of being turned away like a student
+    os.environ.update({"API_RATE_LIMIT": str(args.rate), "API_BURST": str(max(1, int(args.rate))),
+                       "API_MAX_WAIT": "600", "API_MAX_WAITING": str(10 * args.workers)})
+
+    # Imported here so the rate limiter is built with the settings above
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")  # Not running under `streamlit run` is expected here
+    from bootstrap import get_config
+    from jobs import Job
+    from pipeline import answer_question
+    from response_cache import get_response_cache, make_cache_key
+
+    config = get_config()  # Secrets, else the environment and .env - the same lookup as the app
+    model = args.model or config["model"]
+    api_key = config["api_key"]
+
+    items = expand(read_topics(args.topics), args.language or LANGUAGES, args.subject or SUBJECTS,
+                   parse_grades(args.grades))
+    done = load_checkpoint(args.checkpoint)
+    todo, seen = [], set(done)
+    for item in items:
+        key = make_cache_key(item[3], item[0], item[1], item[2], model)
+        if key not in seen:
+            seen.add(key)
+            todo.append((key, item))
+    print(f"{len(items)} items, {len(items) - len(todo)} already done, {len(todo)} to go")
+    if args.dry_run or not todo:
+        return 0
+    if not api_key:
+        sys.exit("OPENROUTER_API_KEY is not set")
+
+    if os.path.dirname(args.checkpoint):
+        os.makedirs(os.path.dirname(args.checkpoint), exist_ok=True)
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8")
+    checkpoint_lock = threading.Lock()
+    stop = threading.Event()
+    sources = Counter()
+    failures = []
+
+    def run(number, key, item):
+        language, subject, grade, question = item
+        for attempt in range(args.retries):
+            if stop.is_set():
+                return "skipped"
+            result = answer_question(Job(f"precompute-{number}", "precompute"), question,
+                                     language, subject, grade, api_key, model)
+            if result["source"] != "busy":
+                break
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+        source = result["source"]
+        if source == "llm" and result["ttft"] is None:
+            return "partial"  # The explanation failed; the text is not worth pinning
+        if source in ("cache", "llm"):
+            get_response_cache().set(key, result["text"], ttl=0)  # Pin it for the term
+        elif source != "knowledge_base":
+            return source  # Offline, busy or error - try again next run
+        with checkpoint_lock:
+            checkpoint.write(key + "\n")
+            checkpoint.flush()
+        return source
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="precompute")
+    try:
+        futures = {executor.submit(run, number, key, item): item for number, (key, item) in enumerate(todo)}
+        for finished, future in enumerate(as_completed(futures), 1):
+            language, subject, grade, question = futures[future]
+            source = future.result()
+            sources[source] += 1
+            if source not in ("cache", "llm", "knowledge_base", "skipped"):
+                failures.append(futures[future])
+                if len(failures) >= args.max_failures and not stop.is_set():
+                    print(f"{len(failures)} failures - stopping; rerun to resume", file=sys.stderr)
+                    stop.set()
+            print(f"[{finished}/{len(todo)}] {source:<14} {language} | {subject} | grade {grade} | {question}")
+    except KeyboardInterrupt:
+        print("Interrupted - finishing questions in flight; rerun to resume", file=sys.stderr)
+        stop.set()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        checkpoint.close()
+
+    summary = ", ".join(f"{source} {count}" for source, count in sources.most_common())
+    print(f"Finished in {time.monotonic() - started:.0f}s: {summary or 'nothing run'}")
+    return 1 if failures or stop.is_set() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Local first pass over what a student types, before anything reaches the LLM.
+
+Normalizes the text, detects its script and language, and sorts it into an
+intent with a few compiled rules. Greetings, thanks, yes/no, typed quiz
+answers and empty input are handled by the app without an API call; only
+"question" goes to the pipeline.
+"""
+import re
+
+from knowledge_base import language_code
+from response_cache import normalize_text
+
+HINDI = "हिंदी (Hindi)"
+
+_SPACE_RE = re.compile(r"\s+")
+_DEVANAGARI_RE = re.compile(r"[ऀ-ॿ]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_WORD_RE = re.compile(r"\w")
+_STRIP_RE = re.compile(r"[^\w\sऀ-ॣ०-ॿ]+")  # Punctuation, emoji and the danda
+
+# Romanized Hindi function words; enough of them in Latin text means Hinglish
+_HINGLISH_RE = re.compile(r"\b(?:hai|hain|kya|kyu|kyun|kyon|kaise|kaisa|kaun|kab|kahan|kitna|kitne|nahi|nahin|"
+                          r"mujhe|hume|humein|batao|bataiye|samjhao|samjhaiye|matlab|hota|hoti|hote|aur|"
+                          r"mein|ka|ki|ke|ko|se|bhi|yeh|ye|woh|wo|kuch|accha|acha)\b")
+HINGLISH_MIN_WORDS = 2
+
+_INTENTS = [
+    ("greeting", re.compile(r"(?:hi+|hello+|hey+|hiya|namaste|namaskar|pranam|good (?:morning|afternoon|evening)|"
+                            r"नमस्ते|नमस्कार|प्रणाम)(?: (?:there|buddy|learningbuddy|sir|ma ?am|didi|bhaiya|ji|जी))?")),
+    ("thanks", re.compile(r"(?:thanks|thank you|thank u|thx|ty|dhanyavad|dhanyawad|shukriya|धन्यवाद|शुक्रिया)"
+                          r"(?: (?:so much|a lot|very much|ji|जी))?")),
+    ("yes", re.compile(r"(?:yes|y|yeah|yep|yup|sure|ok|okay|haan?|han|ji haan?|ji|theek hai|thik hai|"
+                       r"हां|हा|जी|जी हां|ठीक है)(?: (?:please|plz|ji|जी))?")),
+    ("no", re.compile(r"(?:no|n|nope|nah|not now|nahi|nahin|na|abhi nahi|नहीं|नही|ना|अभी नहीं)"
+                      r"(?: (?:thanks|thank you|ji|जी))?")),
+]
+_QUIZ_ANSWER_RE = re.compile(r"(?:option |answer |ans |उत्तर )?\(?([a-d])\)?\.?")
+# While a quiz runs: an option letter followed by more text, as the buttons show it ("c) Six",
+# "b. Oxygen", "option b is correct")
+_QUIZ_ANSWER_TEXT_RE = re.compile(r"(?:(?:option|answer|ans|उत्तर)\s*)?\(?([a-d])\s*(?:[).:\-]|\s+(?:is|hai|है)\b).*",
+                                  re.DOTALL)
+
+LOCAL_REPLIES = {
+    "greeting": {
+        "en": "👋 Hi there! What would you like to learn today? Type your question and I'll explain it step by step.",
+        "hi": "👋 नमस्ते! आज तुम क्या सीखना चाहोगे? अपना प्रश्न लिखो, मैं उसे आसान चरणों में समझाऊंगा।",
+    },
+    "thanks": {
+        "en": "😊 You're welcome! Ask me another question whenever you like.",
+        "hi": "😊 आपका स्वागत है! जब चाहो, अगला प्रश्न पूछो।",
+    },
+    "yes": {
+        "en": "👍 Great! What would you like to learn next? Type your question below.",
+        "hi": "👍 बढ़िया! अब तुम क्या सीखना चाहोगे? नीचे अपना प्रश्न लिखो।",
+    },
+    "no": {
+        "en": "👍 No problem! Ask me another question whenever you're ready.",
+        "hi": "👍 कोई बात नहीं! जब तैयार हो, अगला प्रश्न पूछो।",
+    },
+    "empty": {
+        "en": "✏️ Please type your question - for example, \"Why is the sky blue?\"",
+        "hi": "✏️ कृपया अपना प्रश्न लिखो - जैसे, \"आसमान नीला क्यों दिखता है?\"",
+    },
+}
+
+
+class Query:
+    """What the student typed, normalized and classified."""
+
+    __slots__ = ("text", "script", "language", "intent", "choice")
+
+    def __init__(self, text, script, language, intent, choice=None):
+        self.text = text  # Normalized; what the pipeline and cache keys see
+        self.script = script  # "devanagari", "latin", "mixed" or "none"
+        self.language = language  # "hi", "hinglish" or "en"
+        self.intent = intent  # greeting, thanks, yes, no, quiz_answer, empty or question
+        self.choice = choice  # Option letter for quiz_answer
+
+    def __repr__(self):
+        return f"Query({self.text[:40]!r}, {self.script}, {self.language}, {self.intent})"
+
+
+def detect_script(text):
+    devanagari = len(_DEVANAGARI_RE.findall(text))
+    latin = len(_LATIN_RE.findall(text))
+    if not devanagari and not latin:
+        return "none"
+    if devanagari and latin:
+        return "mixed" if min(devanagari, latin) * 4 >= max(devanagari, latin) else (
+            "devanagari" if devanagari > latin else "latin")
+    return "devanagari" if devanagari else "latin"
+
+
+def _bare(text):
+    return _SPACE_RE.sub(" ", _STRIP_RE.sub(" ", normalize_text(text).casefold())).strip()
+
+
+def preprocess(text, options=None):
+    """Normalize and classify one chat input.
+
+    options are the current quiz question's options while a quiz runs; input
+    that names one of them (by letter with its text, or by its text alone)
+    is then a quiz answer rather than a new question.
+    """
+    text = normalize_text(text)
+    script = detect_script(text)
+    bare = _bare(text)
+
+    if script in ("devanagari", "mixed"):
+        language = "hi"  # Anyone typing Devanagari reads it
+    elif len(_HINGLISH_RE.findall(bare)) >= HINGLISH_MIN_WORDS:
+        language = "hinglish"
+    else:
+        language = "en"
+
+    if not _WORD_RE.search(bare):
+        return Query(text, script, language, "empty")
+    answer = _QUIZ_ANSWER_RE.fullmatch(text.casefold())
+    if answer:
+        return Query(text, script, language, "quiz_answer", answer.group(1))
+    if options:
+        answer = _QUIZ_ANSWER_TEXT_RE.fullmatch(text.casefold())
+        if answer:
+            return Query(text, script, language, "quiz_answer", answer.group(1))
+        for letter, option in zip("abcd", options):
+            if bare == _bare(str(option)):
+                return Query(text, script, language, "quiz_answer", letter)
+    for intent, pattern in _INTENTS:
+        if pattern.fullmatch(bare):
+            return Query(text, script, language, intent)
+    return Query(text, script, language, "question")
+
+
+def answer_language(query, selected):
+    """Language to answer in: Hindi for Devanagari or Hinglish input, else the sidebar choice.
+
+    Students who type romanized Hindi ("photosynthesis kya hai") are asking in
+    Hindi, whatever the sidebar says.
+    """
+    return HINDI if query.language in ("hi", "hinglish") else selected
+
+
+def local_reply(intent, language):
+    """Canned reply for an intent that needs no LLM, in the answer language.
+
+    A quiz answer typed with no quiz running gets the "empty" reply.
+    """
+    return LOCAL_REPLIES.get(intent, LOCAL_REPLIES["empty"])[language_code(language)]
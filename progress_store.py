@@ -0,0 +1,333 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from chat_history import Message
+from metrics import get_metrics
+
+DEFAULT_DB_PATH = os.path.join(".cache", "progress.sqlite3")
+FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", 0.5))  # Seconds a write may wait to join a batch
+BATCH_SIZE = 200  # Writes per transaction at most
+PAGE_SIZE = 50  # Messages fetched per read when a restored history is scrolled back
+
+# Batches are applied in this order, so e.g. an attempt's row and answers exist before it is finished
+WRITE_ORDER = ("session", "message", "attempt", "answer", "finish")
+
+
+class SQLiteBackend:
+    """Progress tables in SQLite, in WAL mode so reads don't wait for the writer."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                student TEXT NOT NULL,
+                language TEXT,
+                subject TEXT,
+                grade INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_student ON sessions (student, updated_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS quiz_attempts (
+                id TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                student TEXT NOT NULL,
+                subject TEXT,
+                grade INTEGER,
+                language TEXT,
+                topic TEXT,
+                questions INTEGER NOT NULL,
+                correct INTEGER NOT NULL DEFAULT 0,
+                score REAL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS quiz_attempts_student ON quiz_attempts (student, started_at);
+            CREATE INDEX IF NOT EXISTS quiz_attempts_topic ON quiz_attempts (subject, grade, language, topic);
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                attempt_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                question_id INTEGER,
+                choice TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL,
+                PRIMARY KEY (attempt_id, position)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS quiz_answers_question ON quiz_answers (question_id);
+        """)
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+    def write(self, batch):
+        """Apply a batch of (kind, row) writes in one transaction."""
+        rows = {kind: [] for kind in WRITE_ORDER}
+        for kind, row in batch:
+            rows[kind].append(row)
+        with self._writer:
+            self._writer.executemany(
+                "INSERT INTO sessions (id, student, language, subject, grade, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET language = excluded.language, "
+                "subject = excluded.subject, grade = excluded.grade, updated_at = excluded.updated_at",
+                [(session_id, student, language, subject, grade, now, now)
+                 for session_id, student, language, subject, grade, now in rows["session"]])
+            # Numbered at insert time, so two tabs on one session append instead of overwriting each other
+            self._writer.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, created_at) VALUES (?1, "
+                "(SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?1), ?2, ?3, ?4)",
+                rows["message"])
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO quiz_attempts (id, session_id, student, subject, grade, language, topic, "
+                "questions, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows["attempt"])
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO quiz_answers (attempt_id, position, question_id, choice, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows["answer"])
+            self._writer.executemany(
+                "UPDATE quiz_attempts SET score = ?, finished_at = ?, correct = "
+                "(SELECT COALESCE(SUM(correct), 0) FROM quiz_answers WHERE attempt_id = ?3) WHERE id = ?3",
+                rows["finish"])
+
+    def load_session(self, session_id):
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT student, language, subject, grade FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            count = self._reader.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        return {"id": session_id, "student": row[0], "language": row[1], "subject": row[2], "grade": row[3],
+                "messages": count}
+
+    def messages(self, session_id, start, count):
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (session_id, start, count)).fetchall()
+        return [Message(role, content) for role, content in rows]
+
+    def attempts(self, student=None, subject=None, grade=None, language=None, topic=None, limit=20):
+        """Most recent finished quiz attempts, by student and/or topic."""
+        filters = {"student": student, "subject": subject, "grade": grade, "language": language, "topic": topic}
+        filters = {column: value for column, value in filters.items() if value is not None}
+        where = "".join(f" AND {column} = ?" for column in filters)
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT id, student, subject, grade, language, topic, questions, correct, score, finished_at "
+                f"FROM quiz_attempts WHERE finished_at IS NOT NULL{where} ORDER BY started_at DESC LIMIT ?",
+                (*filters.values(), limit)).fetchall()
+        columns = ("id", "student", "subject", "grade", "language", "topic", "questions", "correct", "score",
+                   "finished_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+
+class MemoryBackend:
+    """Progress kept in this process only; for tests and read-only filesystems."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.session_messages = {}
+        self.quiz_attempts = {}
+        self._lock = threading.Lock()
+
+    def write(self, batch):
+        rows = {kind: [] for kind in WRITE_ORDER}
+        for kind, row in batch:
+            rows[kind].append(row)
+        with self._lock:
+            for session_id, student, language, subject, grade, now in rows["session"]:
+                self.sessions[session_id] = {"id": session_id, "student": student, "language": language,
+                                             "subject": subject, "grade": grade}
+            for session_id, role, content, _ in rows["message"]:
+                stored = self.session_messages.setdefault(session_id, {})
+                stored[len(stored)] = Message(role, content)
+            for attempt_id, session_id, student, subject, grade, language, topic, questions, now in rows["attempt"]:
+                self.quiz_attempts[attempt_id] = {
+                    "id": attempt_id, "student": student, "subject": subject, "grade": grade, "language": language,
+                    "topic": topic, "questions": questions, "correct": 0, "score": None, "finished_at": None,
+                    "started_at": now, "answers": {}}
+            for attempt_id, position, _, _, correct, _ in rows["answer"]:
+                if attempt_id in self.quiz_attempts:
+                    self.quiz_attempts[attempt_id]["answers"][position] = correct
+            for score, now, attempt_id in rows["finish"]:
+                if attempt_id in self.quiz_attempts:
+                    attempt = self.quiz_attempts[attempt_id]
+                    attempt.update(score=score, finished_at=now, correct=sum(attempt["answers"].values()))
+
+    def load_session(self, session_id):
+        with self._lock:
+            if session_id not in self.sessions:
+                return None
+            return {**self.sessions[session_id], "messages": len(self.session_messages.get(session_id, {}))}
+
+    def messages(self, session_id, start, count):
+        with self._lock:
+            stored = self.session_messages.get(session_id, {})
+            return [stored[seq] for seq in sorted(stored) if seq >= start][:count]
+
+    def attempts(self, student=None, subject=None, grade=None, language=None, topic=None, limit=20):
+        filters = {"student": student, "subject": subject, "grade": grade, "language": language, "topic": topic}
+        with self._lock:
+            found = [attempt for attempt in self.quiz_attempts.values() if attempt["finished_at"] is not None
+                     and all(value is None or attempt[key] == value for key, value in filters.items())]
+        found.sort(key=lambda attempt: attempt["started_at"], reverse=True)
+        return [{key: value for key, value in attempt.items() if key not in ("answers", "started_at")}
+                for attempt in found[:limit]]
+
+
+# PROGRESS_BACKEND -> factory; another store only needs write, load_session, messages and attempts
+BACKENDS = {
+    "sqlite": lambda: SQLiteBackend(os.getenv("PROGRESS_DB_PATH", DEFAULT_DB_PATH)),
+    "memory": MemoryBackend,
+}
+
+
+class History:
+    """A session's chat history as a list that reads stored messages a page at a time.
+
+    A restored session starts with only its message count; rendering the
+    recent turns loads just the last page. Appended messages are kept in
+    memory and written through to the store.
+    """
+
+    def __init__(self, store, session_id, stored=0):
+        self.store = store
+        self.session_id = session_id
+        self._stored = stored
+        self._pages = {}  # page number -> messages
+        self._new = []
+
+    def __len__(self):
+        return self._stored + len(self._new)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index >= self._stored:
+            return self._new[index - self._stored]
+        page = index // PAGE_SIZE
+        if page not in self._pages:
+            self._pages[page] = self.store.backend.messages(self.session_id, page * PAGE_SIZE, PAGE_SIZE)
+        return self._pages[page][index % PAGE_SIZE]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, message):
+        self.store.add_message(self.session_id, message)
+        self._new.append(message)
+
+
+class ProgressStore:
+    """Sessions, messages and quiz results, written behind the UI in batches.
+
+    Writes go on a queue and return at once; a background thread commits
+    whatever has queued up every FLUSH_INTERVAL seconds as one transaction,
+    so a quiz click never waits on disk. Reads go straight to the backend.
+    """
+
+    def __init__(self, backend, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._stats = {"writes": 0, "batches": 0, "failed_batches": 0}
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def save_session(self, session_id, student, language, subject, grade):
+        self._queue.put(("session", (session_id, student, language, subject, grade, time.time())))
+
+    def add_message(self, session_id, message):
+        """Append a message to a session; the backend numbers it after whatever is stored."""
+        self._queue.put(("message", (session_id, message.role, message.content, time.time())))
+
+    def start_attempt(self, attempt_id, session_id, student, subject, grade, language, topic, questions):
+        self._queue.put(("attempt", (attempt_id, session_id, student, subject, grade, language, topic,
+                                     questions, time.time())))
+
+    def record_answer(self, attempt_id, position, question_id, choice, correct):
+        self._queue.put(("answer", (attempt_id, position, question_id, choice, int(correct), time.time())))
+
+    def finish_attempt(self, attempt_id, score):
+        self._queue.put(("finish", (score, time.time(), attempt_id)))
+
+    def load_session(self, session_id):
+        """Settings and message count of a stored session, or None.
+
+        Waits for queued writes first: History numbers new messages from this
+        count, and a count missing queued messages would overwrite them.
+        """
+        if not session_id:
+            return None
+        self.flush()
+        return self.backend.load_session(session_id)
+
+    def history(self, session_id, stored=0):
+        return History(self, session_id, stored)
+
+    def attempts(self, **filters):
+        return self.backend.attempts(**filters)
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        self._queue.join()
+
+    def stats(self):
+        return {**self._stats, "queued": self._queue.qsize()}
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with get_metrics().time("progress_flush"):
+                    self.backend.write(batch)
+                self._stats["writes"] += len(batch)
+                self._stats["batches"] += 1
+            except Exception as e:
+                # Progress is best effort - never take the writer down with a bad batch
+                self._stats["failed_batches"] += 1
+                get_metrics().incr("errors", type=f"progress_{type(e).__name__}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+@st.cache_resource
+def get_progress_store():
+    """Process-wide progress store; PROGRESS_BACKEND picks sqlite (default) or memory."""
+    try:
+        return ProgressStore(BACKENDS[os.getenv("PROGRESS_BACKEND", "sqlite")]())
+    except (sqlite3.Error, OSError):
+        return ProgressStore(MemoryBackend())  # Read-only filesystem etc. - keep progress in memory
@@ -0,0 +1,175 @@
+import os
+
+from conversation import count_tokens
+from knowledge_base import language_code
+
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", 4000))  # Prompt plus completion
+MIN_COMPLETION_TOKENS = 200
+
+SYSTEM_PROMPT = """You are LearningBuddy, a friendly, bilingual AI tutor for children in Grades 1–12.
+
+Your role is to:
+1. Provide clear, age-appropriate explanations in simple language
+2. Use emojis and visual descriptions to make learning engaging
+3. Be patient, encouraging, and supportive
+4. Adapt content to the student's grade level and language
+5. Maintain a positive and motivating tone
+
+For quizzes:
+- Generate 10 relevant questions with 4 options each
+- Include a mix of difficulty levels
+- Provide clear feedback for each answer
+- Be encouraging regardless of the score
+
+Format your responses with clear sections and use markdown for better readability."""
+
+# What the sidebar offers; precompute.py covers the same combinations
+LANGUAGES = ["English", "हिंदी (Hindi)"]
+SUBJECTS = ["Science", "Maths", "English", "EVS", "Hindi"]
+GRADES = list(range(1, 13))
+
+GRADE_BANDS = {
+    "primary": range(1, 6),
+    "middle": range(6, 9),
+    "secondary": range(9, 13),
+}
+
+BAND_GUIDANCE = {
+    "primary": "The student is in Grades 1-5: use very short sentences, everyday examples and plenty of emojis.",
+    "middle": "The student is in Grades 6-8: use simple language and give each new term a one-line meaning.",
+    "secondary": "The student is in Grades 9-12: be precise, use correct terminology and show worked steps or formulas where they help.",
+}
+
+LANGUAGE_NAMES = {"en": "English", "hi": "Hindi (हिंदी)"}
+
+# Mode -> (instructions, completion tokens per grade band)
+MODES = {
+    "explanation": ("""Please provide a clear, age-appropriate explanation in {language}.
+Do not include a quiz or video links - those are added separately.
+Format your response with clear sections.""",
+                    {"primary": 500, "middle": 700, "secondary": 900}),
+    "quiz": ("""Write a 10-question multiple choice quiz in {language} about the student's question, in this format:
+Q1. [Question]?
+a) Option 1
+b) Option 2
+c) Option 3
+d) Option 4
+Answer: [correct_letter]
+
+Continue for 10 questions. Only output the quiz.""",
+             {"primary": 1000, "middle": 1200, "secondary": 1400}),
+    "video": ("""Suggest one relevant, child-friendly YouTube video in {language} for this question.
+Reply with a single markdown line and nothing else:
+🎥 [Video title](https://www.youtube.com/results?search_query=search+words)""",
+              {"primary": 120, "middle": 120, "secondary": 120}),
+}
+
+# Classroom prompt: the variable fields go last, after every static instruction
+STUDENT_TEMPLATE = """Subject: {subject}
+Grade: {grade}
+
+Student's question: {question}"""
+
+# The personalized tutor prompt used by helper.py
+PERSONALIZED_INSTRUCTIONS = {
+    "en": """You are a friendly, super helpful, and creative AI teacher designed especially for children aged 6–14. Your role is to explain concepts in an easy, fun, and visually engaging way. You will provide answers to any question the child asks, in a way that makes learning personalized, interactive, and memorable.
+
+Response Structure:
+- Always speak like a kind mentor or favorite teacher.
+- Use words like "Great question!", "Wow, you're curious!", "Let's explore this together!".
+- Break down answers into simple steps.
+- Avoid technical jargon; use short sentences and bullet points for clarity.
+- Add fun emojis, colors, or simple illustrations (ASCII or descriptions).
+- Ask questions back to engage the child or include small challenges/mini-quizzes.
+- Include examples, analogies, or mini activities that fit their learning style (Visual: diagrams, Auditory: rhymes, Kinesthetic: exercises).
+- Always be positive, motivating, and supportive.
+- Answer in English.""",
+    "hi": """आप एक अनुकूल, सहायक और रचनात्मक AI शिक्षक हैं, जो विशेष रूप से 6-14 वर्ष की आयु के बच्चों के लिए डिज़ाइन किया गया है। आपका उद्देश्य अवधारणाओं को आसान, मज़ेदार और दृष्टिगत रूप से आकर्षक तरीके से समझाना है। बच्चे के प्रश्न का उत्तर इस तरह दें कि सीखना व्यक्तिगत, इंटरैक्टिव और यादगार हो।
+
+उत्तर संरचना:
+- अनुकूल और प्रोत्साहक स्वर का उपयोग करें (जैसे "शानदार प्रश्न!", "वाह, तुम जिज्ञासु हो!", "आइए इसे साथ मिलकर खोजें!")।
+- उत्तर को सरल चरणों में तोड़ें।
+- तकनीकी शब्दों से बचें; छोटे वाक्यों और बुलेट पॉइंट्स का उपयोग करें।
+- मज़ेदार इमोजी, रंग या सरल चित्रण जोड़ें।
+- बच्चे को शामिल करने के लिए प्रश्न पूछें या छोटी चुनौतियां दें।
+- उदाहरण, एनालॉजी या मिनी गतिविधियां शामिल करें जो उनकी सीखने की शैली से मेल खाएं (Visual: चित्र, Auditory: कहानियां, Kinesthetic: व्यायाम)।
+- हमेशा सकारात्मक, प्रेरक और सहायक रहें।
+- उत्तर हिंदी में दें।""",
+}
+PERSONALIZED_TEMPLATES = {
+    "en": """Child's name: {name}
+Learning style: {learning_style}
+
+Question: {question}""",
+    "hi": """बच्चे का नाम: {name}
+सीखने की शैली: {learning_style}
+
+प्रश्न: {question}""",
+}
+PERSONALIZED_MAX_TOKENS = 900
+
+
+def grade_band(grade):
+    """Grade band for a grade; unknown grades fall in the middle band."""
+    try:
+        grade = int(grade)
+    except (TypeError, ValueError):
+        return "middle"
+    for band, grades in GRADE_BANDS.items():
+        if grade in grades:
+            return band
+    return "middle"
+
+
+class PromptTemplate:
+    """A compiled prompt: a static system block, then history, then the variable fields.
+
+    The system block is byte-identical for every request with the same key,
+    so the provider can reuse its cached prefix. Its token count, and that
+    of the user template's fixed text, are computed once at import.
+    """
+
+    def __init__(self, key, system, user_template, max_tokens):
+        self.key = key
+        self.system = system
+        self.user_template = user_template
+        self.max_tokens = max_tokens
+        self.system_tokens = count_tokens(system)
+        self.user_tokens = count_tokens(user_template)
+
+    def render(self, history=None, **fields):
+        """Return (messages, max_tokens) with max_tokens trimmed to the request budget."""
+        history = history or []
+        messages = [
+            {"role": "system", "content": self.system},
+            *history,
+            {"role": "user", "content": self.user_template.format(**fields)},
+        ]
+        prompt_tokens = (self.system_tokens + self.user_tokens
+                         + sum(count_tokens(str(value)) for value in fields.values())
+                         + sum(count_tokens(message["content"]) for message in history))
+        max_tokens = min(self.max_tokens, max(MIN_COMPLETION_TOKENS, REQUEST_TOKEN_BUDGET - prompt_tokens))
+        return messages, max_tokens
+
+
+def _compile():
+    templates = {}
+    for language, language_name in LANGUAGE_NAMES.items():
+        for band, guidance in BAND_GUIDANCE.items():
+            for mode, (instructions, max_tokens) in MODES.items():
+                system = "\n\n".join([SYSTEM_PROMPT, guidance, instructions.format(language=language_name)])
+                templates[(language, band, mode)] = PromptTemplate(
+                    (language, band, mode), system, STUDENT_TEMPLATE, max_tokens[band])
+            templates[(language, band, "personalized")] = PromptTemplate(
+                (language, band, "personalized"),
+                "\n\n".join([PERSONALIZED_INSTRUCTIONS[language], guidance]),
+                PERSONALIZED_TEMPLATES[language], PERSONALIZED_MAX_TOKENS)
+    return templates
+
+
+TEMPLATES = _compile()
+
+
+def get_template(language, grade, mode):
+    """Compiled template for a language (name or code), grade and mode."""
+    return TEMPLATES[(language_code(language), grade_band(grade), mode)]
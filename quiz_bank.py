@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+import streamlit as st
+
+from knowledge_base import get_knowledge_base, tokenize
+from response_cache import normalize_question
+
+DEFAULT_DB_PATH = os.path.join(".cache", "quiz_bank.sqlite3")
+QUIZ_SIZE = 10
+
+# MinHash over character shingles; 8 LSH bands of 4 rows catch pairs with
+# Jaccard similarity above ~0.6, which are then checked against the threshold
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.8
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)  # Fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def minhash_signature(question, options):
+    """MinHash signature of a question and its options."""
+    text = normalize_question(" ".join([question] + list(options)))
+    shingles = {
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8"))
+        for i in range(max(1, len(text) - SHINGLE_SIZE + 1))
+    }
+    return [min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def _band_keys(signature):
+    return [
+        f"{band}:{zlib.crc32(json.dumps(signature[band * ROWS:(band + 1) * ROWS]).encode())}"
+        for band in range(BANDS)
+    ]
+
+
+def quiz_topic(question, subject=None, grade=None):
+    """Stable topic label for a student's question.
+
+    Questions that match a knowledge base entry share its topic, so differently
+    worded questions about photosynthesis fill the same quiz slot.
+    """
+    for _, coverage, entry in get_knowledge_base().search(question, subject, grade, top_k=1):
+        if coverage >= 0.5:
+            return entry["id"]
+    return " ".join(sorted(set(tokenize(question)))) or normalize_question(question)
+
+
+class QuizBank:
+    """Persistent, deduplicated store of quiz questions indexed by subject/grade/language/topic.
+
+    Duplicates are found across every topic of a subject/grade/language, so
+    one question can serve several topics; slot_questions records which
+    topics ("slots") each question belongs to.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                subject TEXT NOT NULL,
+                grade INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS questions_slot ON questions (subject, grade, language, topic);
+            CREATE TABLE IF NOT EXISTS question_bands (
+                band TEXT NOT NULL,
+                question_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS question_bands_band ON question_bands (band);
+            CREATE TABLE IF NOT EXISTS slot_questions (
+                subject TEXT NOT NULL,
+                grade INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                PRIMARY KEY (subject, grade, language, topic, question_id)
+            );
+            -- Banks from before slot_questions: each question belongs to the topic it was stored under
+            INSERT OR IGNORE INTO slot_questions SELECT subject, grade, language, topic, id FROM questions;
+        """)
+
+    def add_questions(self, questions, subject, grade, language, topic):
+        """Store parsed questions, skipping near-duplicates.
+
+        Returns the bank id of each question, in order; a duplicate gets the id
+        of the question it duplicates, which then counts towards this topic too.
+        Questions without an answer are not stored.
+        """
+        ids = []
+        with self._lock:
+            for question in questions:
+                if not question.get("answer") or len(question.get("options", [])) < 2:
+                    ids.append(None)
+                    continue
+                signature = minhash_signature(question["question"], question["options"])
+                bands = _band_keys(signature)
+                question_id = self._find_duplicate(signature, bands, subject, grade, language)
+                if question_id is None:
+                    question_id = self._insert(question, signature, bands, subject, grade, language, topic)
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO slot_questions (subject, grade, language, topic, question_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (subject, int(grade), language, topic, question_id),
+                )
+                ids.append(question_id)
+            self._conn.commit()
+        return ids
+
+    def _insert(self, question, signature, bands, subject, grade, language, topic):
+        cursor = self._conn.execute(
+            "INSERT INTO questions (subject, grade, language, topic, question, options, "
+            "answer, signature, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (subject, int(grade), language, topic, question["question"],
+             json.dumps(question["options"], ensure_ascii=False), question["answer"],
+             json.dumps(signature), time.time()),
+        )
+        self._conn.executemany(
+            "INSERT INTO question_bands (band, question_id) VALUES (?, ?)",
+            [(band, cursor.lastrowid) for band in bands],
+        )
+        return cursor.lastrowid
+
+    def _find_duplicate(self, signature, bands, subject, grade, language):
+        placeholders = ",".join("?" * len(bands))
+        rows = self._conn.execute(
+            f"SELECT DISTINCT q.id, q.signature FROM question_bands b "
+            f"JOIN questions q ON q.id = b.question_id "
+            f"WHERE b.band IN ({placeholders}) AND q.subject = ? AND q.grade = ? AND q.language = ?",
+            (*bands, subject, int(grade), language),
+        )
+        for question_id, stored in rows:
+            if similarity(signature, json.loads(stored)) >= DUPLICATE_THRESHOLD:
+                return question_id
+        return None
+
+    def count(self, subject, grade, language, topic):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM slot_questions WHERE subject = ? AND grade = ? AND language = ? AND topic = ?",
+                (subject, int(grade), language, topic),
+            ).fetchone()[0]
+
+    def record_outcome(self, question_id, correct):
+        """Count one attempt at a question; feeds difficulty balancing."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE questions SET attempts = attempts + 1, correct = correct + ? WHERE id = ?",
+                (1 if correct else 0, question_id),
+            )
+            self._conn.commit()
+
+    def build_quiz(self, subject, grade, language, topic, size=QUIZ_SIZE):
+        """Assemble a quiz from the bank with a mix of easy, medium and hard questions.
+
+        Difficulty comes from recorded outcomes (smoothed success rate); within
+        each band, less-tried questions go first so new ones get calibrated.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT q.id, q.question, q.options, q.answer, q.attempts, q.correct FROM slot_questions s "
+                "JOIN questions q ON q.id = s.question_id "
+                "WHERE s.subject = ? AND s.grade = ? AND s.language = ? AND s.topic = ?",
+                (subject, int(grade), language, topic),
+            ).fetchall()
+        bands = {"easy": [], "medium": [], "hard": []}
+        for row in rows:
+            success = (row[5] + 1) / (row[4] + 2)
+            band = "easy" if success >= 0.7 else "hard" if success < 0.4 else "medium"
+            bands[band].append(row)
+        for band_rows in bands.values():
+            random.shuffle(band_rows)
+            band_rows.sort(key=lambda row: row[4])
+
+        # Round-robin across bands, so any quiz mixes difficulties when it can
+        picked = []
+        queues = [bands["easy"], bands["medium"], bands["hard"]]
+        while len(picked) < size and any(queues):
+            for queue in queues:
+                if queue and len(picked) < size:
+                    picked.append(queue.pop(0))
+        return [
+            {"id": row[0], "question": row[1], "options": json.loads(row[2]), "answer": row[3]}
+            for row in picked
+        ]
+
+
+@st.cache_resource
+def get_quiz_bank():
+    """Process-wide quiz bank shared by every Streamlit session."""
+    return QuizBank(os.getenv("QUIZ_BANK_PATH", DEFAULT_DB_PATH))
@@ -0,0 +1,198 @@
+import re
+
+# Option letters the tutor uses, mapped to the a-d keys the quiz UI expects
+OPTION_KEYS = {
+    "a": "a", "b": "b", "c": "c", "d": "d",
+    "क": "a", "ख": "b", "ग": "c", "घ": "d",
+    "1": "a", "2": "b", "3": "c", "4": "d",
+    "१": "a", "२": "b", "३": "c", "४": "d",
+}
+
+# "Q1.", "Q 1)", "Question 1:", "प्रश्न 1:", "प्र.1", "1.", "१." ...
+_QUESTION_RE = re.compile(
+    r"^(?:q(?:uestion)?|प्रश्न|प्र)?\s*\.?\s*[0-9०-९]{1,2}\s*[.:)\-।]\s*(.*)$",
+    re.IGNORECASE,
+)
+# "a) ...", "(b) ...", "C. ...", "क) ..."
+_OPTION_RE = re.compile(r"^\(?([a-dA-Dकखगघ])\s*[).:\-]\s*(.+)$")
+# "1) ...", "(2) ...", "३. ..." - read as options only in sequence right after a question, see _match_option
+_NUMBERED_OPTION_RE = re.compile(r"^\(?([1-4१-४])\s*[).:\-।]\s*(.+)$")
+# "Answer: b", "Correct answer - (c)", "उत्तर: ख", "सही उत्तर: 2"
+_ANSWER_RE = re.compile(
+    r"^(?:correct\s+)?(?:answer|ans|सही\s+उत्तर|उत्तर)\s*[.:\-–]?\s*\(?"
+    r"([a-dA-Dकखगघ1-4१-४])(?![A-Za-zऀ-ॿ])",
+    re.IGNORECASE,
+)
+# Markdown decoration the model likes to wrap quiz lines in
+_DECORATION_RE = re.compile(r"^[\s>#*_\-•]+|[*_]{2}")
+
+
+def _clean(line):
+    return _DECORATION_RE.sub("", line).strip()
+
+
+def _match_option(line, options_seen, numbered):
+    """Option match for a line, or None.
+
+    A numbered line also looks like the next question ("2. ..."), so it only
+    counts as an option when it continues the question's own numbering:
+    "1)" as the first option, "2)" after a numbered "1)" and so on.
+    """
+    match = _OPTION_RE.match(line)
+    if match:
+        return match
+    match = _NUMBERED_OPTION_RE.match(line)
+    if match and (numbered or not options_seen) and options_seen < 4 \
+            and OPTION_KEYS[match.group(1)] == "abcd"[options_seen]:
+        return match
+    return None
+
+
+class QuizStreamParser:
+    """Push-based quiz parser: feed text chunks, get back completed questions.
+
+    A question is emitted as soon as its "Answer:" line has been read, so the
+    first question is usable while the rest of the response is still
+    streaming. Set keep_questions=False for long outputs to keep memory bounded
+    to the question being parsed; lines longer than max_line_length are dropped.
+    """
+
+    def __init__(self, max_questions=10, keep_questions=True, max_line_length=2000):
+        self.max_questions = max_questions
+        self.keep_questions = keep_questions
+        self.max_line_length = max_line_length
+        self.questions = []
+        self.count = 0
+        self._buffer = ""
+        self._current = None
+        self._overflow = False
+
+    @property
+    def done(self):
+        return self.count >= self.max_questions
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the questions it completed."""
+        if self.done or not chunk:
+            return []
+        self._buffer += chunk
+        if "\n" not in chunk:
+            if len(self._buffer) > self.max_line_length:
+                self._buffer = ""
+                self._overflow = True  # Drop the rest of this over-long line
+            return []
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        for line in lines:
+            if self._overflow:
+                self._overflow = False
+                continue
+            question = self._parse_line(line)
+            if question:
+                completed.append(question)
+                if self.done:
+                    break
+        return completed
+
+    def close(self):
+        """Flush the trailing line; a final question without an answer is kept too."""
+        completed = self.feed("\n") if self._buffer else []
+        current, self._current = self._current, None
+        if not self.done and current and current["text_seen"] and len(current["options"]) >= 2:
+            completed.append(self._emit(current))
+        return completed
+
+    def _parse_line(self, raw_line):
+        line = _clean(raw_line)
+        if not line:
+            return None
+
+        match = _ANSWER_RE.match(line)
+        if match:
+            current, self._current = self._current, None
+            if current and len(current["options"]) >= 2:
+                current["answer"] = OPTION_KEYS[match.group(1).lower()]
+                return self._emit(current)
+            return None
+
+        current = self._current
+        match = current is not None and _match_option(line, len(current["options"]), current["numbered"])
+        if match:
+            current["numbered"] = match.re is _NUMBERED_OPTION_RE
+            current["options"].append(match.group(2).strip())
+            if "correct" in line.lower() or "✅" in line:
+                current["answer"] = OPTION_KEYS[match.group(1).lower()]
+            return None
+
+        match = _QUESTION_RE.match(line)
+        if match:
+            text = match.group(1).strip()
+            self._current = {"question": text, "options": [], "answer": None, "text_seen": bool(text),
+                             "numbered": False}
+            # Answers marked inline on an option ("c) Oxygen (correct)") have no Answer: line
+            if current and current["answer"] and len(current["options"]) >= 2:
+                return self._emit(current)
+            return None
+
+        # Question text on the line after a bare "Q1." header
+        if current is not None and not current["text_seen"] and not current["options"]:
+            current["question"] = line
+            current["text_seen"] = True
+        return None
+
+    def _emit(self, current):
+        question = {
+            "question": current["question"],
+            "options": current["options"],
+            "answer": current["answer"],
+        }
+        self.count += 1
+        if self.keep_questions:
+            self.questions.append(question)
+        return question
+
+
+def parse_quiz_response(response_text, max_questions=10):
+    """Parse the quiz questions and answers from a complete AI response."""
+    parser = QuizStreamParser(max_questions=max_questions)
+    parser.feed(response_text)
+    parser.close()
+    return parser.questions
+
+
+_QUIZ_HEADING_RE = re.compile(r"quiz|क्विज़|प्रश्नोत्तरी", re.IGNORECASE)
+
+
+def _starts_quiz(lines, index):
+    """True if the question line at index is followed by options and an answer line."""
+    options, numbered = 0, False
+    for raw_line in lines[index + 1:index + 10]:
+        line = _clean(raw_line)
+        if not line:
+            continue
+        match = _match_option(line, options, numbered)
+        if match:
+            options, numbered = options + 1, match.re is _NUMBERED_OPTION_RE
+        elif _ANSWER_RE.match(line):
+            return options >= 2
+        else:
+            return False
+    return False
+
+
+def strip_quiz(response_text):
+    """The response with its quiz (and the quiz's heading line) cut off.
+
+    Numbered lists in the explanation are kept; only a numbered question
+    followed by options and an answer line starts the cut.
+    """
+    lines = response_text.splitlines()
+    for index, line in enumerate(lines):
+        if _QUESTION_RE.match(_clean(line)) and _starts_quiz(lines, index):
+            cut = index
+            while cut and not lines[cut - 1].strip():
+                cut -= 1
+            if cut and _QUIZ_HEADING_RE.search(lines[cut - 1]):
+                cut -= 1
+            return "\n".join(lines[:cut]).rstrip()
+    return response_text
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import streamlit as st
+
+DEFAULT_DB_PATH = os.path.join(".cache", "responses.sqlite3")
+
+_PUNCT_RE = re.compile(r"[^\w\sऀ-ॣ०-ॿ]")
+_SPACE_RE = re.compile(r"\s+")
+# Variants that render alike and mean the same; every input is folded this way
+_NASAL_FOLDS = str.maketrans({
+    "\u0901": "\u0902",  # Chandrabindu -> anusvara (हाँ / हां)
+    "\u200b": None,      # Zero-width space
+    "\u200c": None,      # Zero-width non-joiner
+    "\u200d": None,      # Zero-width joiner
+    "\ufeff": None,      # Byte order mark
+})
+# Spellings that students type interchangeably; folded for matching only
+_NUKTA_FOLD = str.maketrans({"\u093c": None})  # ज़ / ज
+
+
+def normalize_text(text):
+    """NFC, one form for each Devanagari nasal, no invisible characters and single spaces.
+
+    Meaning-preserving, so the result is what gets sent to the model.
+    """
+    text = unicodedata.normalize("NFC", text).translate(_NASAL_FOLDS)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def normalize_question(question):
+    """Normalize case, punctuation, whitespace and Devanagari variants of a question."""
+    text = normalize_text(question).translate(_NUKTA_FOLD)
+    text = _PUNCT_RE.sub(" ", text.casefold())  # Also drops the danda (।, ॥)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def make_cache_key(question, language, subject, grade, model, *extra):
+    """Build a stable cache key for a question asked in a given tutoring context."""
+    parts = [normalize_question(question), language, subject, str(grade), model, *map(str, extra)]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU tier with the same per-entry TTL as the disk tier."""
+
+    def __init__(self, maxsize=512, ttl=7 * 24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, expires_at = self._data[key]
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value; ttl=None uses the default, ttl=0 keeps it until evicted."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Disk tier with per-entry TTL and least-recently-used eviction by total size."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl=7 * 24 * 3600, max_bytes=50 * 1024 * 1024,
+                 evict_every=50):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+        """)
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        """(value, expires_at or None) for a live entry, else None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row
+
+    def set(self, key, value, ttl=None):
+        """Store a value; ttl=None uses the default, ttl=0 keeps it until evicted."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under the limit; entries
+        # stored with ttl=0 (precomputed syllabus answers) go last
+        excess = total - self.max_bytes
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY expires_at IS NULL, last_access")
+        stale = []
+        for key, size in rows:
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Two-tier response cache: in-process LRU in front of SQLite, with hit/miss stats."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        tier = "memory_hits"
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            tier = "disk_hits"
+            if entry is not None:
+                value, expires_at = entry
+                # Promote to the fast tier, expiring when the disk copy does
+                ttl = 0 if expires_at is None else max(expires_at - time.time(), 1e-3)
+                self.memory.set(key, value, ttl=ttl)
+        with self._lock:
+            self._stats[tier if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=ttl)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide response cache shared by every Streamlit session."""
+    ttl = float(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+    try:
+        disk = SQLiteCache(
+            path=os.getenv("RESPONSE_CACHE_PATH", DEFAULT_DB_PATH),
+            ttl=ttl,
+            max_bytes=int(float(os.getenv("RESPONSE_CACHE_MAX_MB", 50)) * 1024 * 1024),
+        )
+    except (sqlite3.Error, OSError):
+        disk = None  # Read-only filesystem etc. - fall back to memory only
+    return ResponseCache(LRUCache(int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", 512)), ttl=ttl), disk)
@@ -0,0 +1,131 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class RetryPolicy:
+    """Retry budget: attempt cap, total deadline and exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts=3, deadline=30.0, base_delay=0.5, max_delay=8.0):
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Stop calling upstream after repeated failures; let one trial call through after a cool-down."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True  # Half-open: a single trial request
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def call_with_retry(send, policy, breaker=None):
+    """Call send(remaining_seconds) until it returns a successful response.
+
+    Timeouts, connection errors and RETRYABLE_STATUS responses are retried
+    until max_attempts or the total deadline runs out; the last error is then
+    re-raised. DNS failures, other HTTP errors and any other exception are
+    raised straight away.
+    """
+    deadline = time.monotonic() + policy.deadline
+    for attempt in range(policy.max_attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("Tutor service is temporarily unavailable")
+        try:
+            response = send(deadline - time.monotonic())
+            if response.status_code not in RETRYABLE_STATUS:
+                response.raise_for_status()
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+            delay = retry_after_seconds(response)
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                error = e
+            finally:
+                response.close()
+        except requests.exceptions.HTTPError:
+            if breaker is not None:
+                breaker.record_success()  # Upstream answered; the request itself was bad
+            raise
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if breaker is not None:
+                breaker.record_failure()
+            if "NameResolutionError" in str(e) or "Name or service not known" in str(e):
+                raise  # No point retrying DNS; callers fall back to offline mode
+            error, delay = e, None
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()  # E.g. a body cut off mid-read; also releases a half-open trial
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_failure()
+
+        delay = policy.backoff(attempt) if delay is None else delay
+        if attempt == policy.max_attempts - 1 or time.monotonic() + delay >= deadline:
+            raise error
+        time.sleep(delay)
@@ -0,0 +1,252 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from coordinator import BackpressureError
+from jobs import JOB_WORKERS, REQUESTS_PER_JOB
+from llm_client import get_circuit_breaker
+from metrics import get_metrics
+
+STRONG_MODEL = os.getenv("ROUTER_STRONG_MODEL", "openai/gpt-4o")
+FALLBACK_MODELS = [model for model in os.getenv(
+    "ROUTER_FALLBACK_MODELS", "meta-llama/llama-3.1-8b-instruct").split(",") if model.strip()]
+HEDGE_AFTER = float(os.getenv("ROUTER_HEDGE_AFTER", 4))  # Longest wait for a first token before hedging
+MIN_HEDGE_AFTER = 1.0
+STATS_WINDOW = 200  # Recent calls per model that latency and error rates are computed over
+MIN_SAMPLES = 10  # Below this a model's stats are too thin to route on
+ATTEMPTS_PER_REQUEST = 2  # A stalling model plus its hedge
+# Every part of every running job may be hedged at once; an attempt queued here would count as model latency
+ATTEMPT_WORKERS = int(os.getenv("ROUTER_WORKERS", JOB_WORKERS * REQUESTS_PER_JOB * ATTEMPTS_PER_REQUEST))
+MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", 0.5))
+SLOW_P95 = float(os.getenv("ROUTER_SLOW_P95", 8))  # Seconds to first token that count as slow
+
+# First matching rule wins; "default" stands for the app's configured MODEL.
+# Rule keys: min_grade, max_grade, subjects, modes, min_length, max_length, models.
+DEFAULT_POLICY = [
+    # Senior maths and science derivations get the stronger model first
+    {"min_grade": 9, "subjects": ["Maths", "Science"], "modes": ["explanation"], "models": [STRONG_MODEL, "default"]},
+    # So do long, multi-part questions
+    {"min_length": 240, "modes": ["explanation"], "models": [STRONG_MODEL, "default"]},
+    {"models": ["default"]},
+]
+
+
+def load_policy():
+    """Routing rules from the ROUTER_POLICY environment variable (JSON), else DEFAULT_POLICY."""
+    try:
+        return json.loads(os.environ["ROUTER_POLICY"])
+    except (KeyError, ValueError):
+        return DEFAULT_POLICY
+
+
+class AllModelsFailed(Exception):
+    """Raised when every model in a chain failed before producing any text."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{model}: {type(e).__name__}: {e}" for model, e in errors))
+        self.errors = errors
+
+
+class ModelStats:
+    """Rolling time-to-first-token and error rate of one model."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._calls = deque(maxlen=window)  # (seconds to first token or None, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._calls.append((latency, ok))
+
+    def snapshot(self):
+        with self._lock:
+            calls = list(self._calls)
+        latencies = sorted(latency for latency, _ in calls if latency is not None)
+        return {
+            "calls": len(calls),
+            "error_rate": sum(1 for _, ok in calls if not ok) / len(calls) if calls else 0.0,
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+        }
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _matches(rule, grade, subject, question, mode):
+    try:
+        grade = int(grade)
+    except (TypeError, ValueError):
+        grade = None
+    if grade is not None and not rule.get("min_grade", 0) <= grade <= rule.get("max_grade", 99):
+        return False
+    if grade is None and ("min_grade" in rule or "max_grade" in rule):
+        return False
+    if "subjects" in rule and subject not in rule["subjects"]:
+        return False
+    if "modes" in rule and mode not in rule["modes"]:
+        return False
+    return rule.get("min_length", 0) <= len(question) <= rule.get("max_length", 1 << 30)
+
+
+class ModelRouter:
+    """Pick models per request and race them when the first one stalls.
+
+    route() turns the policy into an ordered chain - healthy models first -
+    and stream() walks it: a model that fails before its first token hands
+    over to the next one, and a model that has not produced a token after
+    its hedge delay gets the next one started alongside it. Whichever
+    produces a token first wins and the others are stopped.
+    """
+
+    def __init__(self, policy=None, fallback_models=None, hedge_after=HEDGE_AFTER, max_workers=ATTEMPT_WORKERS):
+        self.policy = policy if policy is not None else load_policy()
+        self.fallback_models = FALLBACK_MODELS if fallback_models is None else fallback_models
+        self.hedge_after = hedge_after
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-attempt")
+
+    def model_stats(self, model):
+        with self._lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def stats(self):
+        """{model: snapshot} for every model that has been called."""
+        with self._lock:
+            models = list(self._stats)
+        return {model: self.model_stats(model).snapshot() for model in models}
+
+    def route(self, grade, subject, question, mode, default_model):
+        """Ordered list of models to try for a request."""
+        rule = next((rule for rule in self.policy if _matches(rule, grade, subject, question, mode)), {})
+        chain = []
+        for model in rule.get("models", ["default"]) + self.fallback_models:
+            model = default_model if model == "default" else model
+            if model not in chain:
+                chain.append(model)
+
+        def demoted(indexed):
+            index, model = indexed
+            snapshot = self.model_stats(model).snapshot()
+            thin = snapshot["calls"] < MIN_SAMPLES
+            failing = get_circuit_breaker(model).state == "open" or (
+                not thin and snapshot["error_rate"] > MAX_ERROR_RATE)
+            slow = not thin and snapshot["p95"] is not None and snapshot["p95"] > SLOW_P95
+            return failing, slow, index
+
+        return [model for _, model in sorted(enumerate(chain), key=demoted)]
+
+    def hedge_delay(self, model):
+        """Hedge at the model's p95 time to first token, but never later than hedge_after."""
+        snapshot = self.model_stats(model).snapshot()
+        if snapshot["calls"] < MIN_SAMPLES or snapshot["p95"] is None:
+            return self.hedge_after
+        return min(self.hedge_after, max(MIN_HEDGE_AFTER, snapshot["p95"]))
+
+    def stream(self, models, start, cancel_event=None):
+        """Yield (model, chunk) from the first of `models` to produce output.
+
+        start(model, stop_event) must return an iterator of chunks and stop
+        early once stop_event is set. Raises AllModelsFailed if every model
+        fails before its first chunk; an error after the first chunk is
+        raised as is, since the text so far has already been shown.
+        """
+        events = queue.Queue()
+        pending = list(models)
+        attempts = {}  # model -> [stop event, started at or None while queued for a thread]
+        errors = []
+        winner = None
+        leading = None  # The attempt the next hedge is timed from
+        hedge_at = float("inf")
+
+        def run(model, stop):
+            # Timed from here, not from launch(): waiting for a free thread is our delay, not the model's
+            events.put((model, "start", time.monotonic()))
+            try:
+                for chunk in start(model, stop):
+                    if stop.is_set():
+                        return
+                    events.put((model, "chunk", chunk))
+                events.put((model, "done", None))
+            except Exception as e:
+                events.put((model, "error", e))
+
+        def launch():
+            model = pending.pop(0)
+            attempts[model] = [threading.Event(), None]
+            self._executor.submit(run, model, attempts[model][0])
+            return model
+
+        leading = launch()
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if winner is None and pending and time.monotonic() >= hedge_at:
+                    get_metrics().incr("model_hedges", model=pending[0])
+                    leading, hedge_at = launch(), float("inf")  # The leading attempt is stalling - race the next
+                try:
+                    model, kind, value = events.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                if kind == "start":
+                    if model in attempts:
+                        attempts[model][1] = value
+                        if model == leading:
+                            hedge_at = value + self.hedge_delay(model)
+                elif kind == "chunk":
+                    if winner is None:
+                        winner = model
+                        self.model_stats(model).record(time.monotonic() - attempts[model][1], True)
+                        for other, (stop, started) in attempts.items():
+                            if other != model:
+                                stop.set()
+                                # A lower bound, but it keeps stalls visible in the loser's p95
+                                if started is not None:
+                                    self.model_stats(other).record(time.monotonic() - started, True)
+                    if model == winner:
+                        yield model, value
+                elif kind == "done":
+                    if winner is None:
+                        winner = model  # Finished without output; nothing better will come
+                        self.model_stats(model).record(time.monotonic() - attempts[model][1], True)
+                    if model == winner:
+                        return
+                elif kind == "error":
+                    if model == winner:
+                        raise value
+                    if winner is not None:
+                        continue
+                    if isinstance(value, BackpressureError):
+                        raise value  # Our own rate limit; another model would not help
+                    self.model_stats(model).record(None, False)
+                    errors.append((model, value))
+                    del attempts[model]
+                    get_metrics().incr("model_errors", model=model, type=type(value).__name__)
+                    if pending:
+                        get_metrics().incr("model_fallbacks", model=pending[0])
+                        leading, hedge_at = launch(), float("inf")  # Fall back to the next model right away
+                    elif not attempts:
+                        raise AllModelsFailed(errors)
+        finally:
+            for stop, _ in attempts.values():
+                stop.set()
+
+
+@st.cache_resource
+def get_router():
+    """Router shared by every Streamlit session, so all of them feed the same latency stats."""
+    return ModelRouter()
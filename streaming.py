@@ -0,0 +1,42 @@
+import json
+import time
+
+
+def iter_stream_deltas(response):
+    """Yield text deltas from an OpenAI-style SSE chat completion response."""
+    # SSE bodies are UTF-8, but requests falls back to ISO-8859-1 when the
+    # content type has no charset, which garbles Hindi text.
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue  # Skip keep-alives, comments and event names
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", "Streaming error"))
+        for choice in chunk.get("choices", []):
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class StreamTimer:
+    """Track time-to-first-token and total time for a streamed answer."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ttft = None
+        self.total = None
+
+    def mark_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self.total
@@ -0,0 +1,45 @@
+import pytest
+
+from conversation import has_own_topic, is_follow_up
+
+
+@pytest.mark.parametrize("question", [
+    "Explain that again",
+    "Tell me more",
+    "Why?",
+    "What does it mean?",
+    "Why do they fall?",
+    "Explain this in simpler words",
+    "Give another example",
+    "Can you say that more simply?",
+    "It is still confusing, can you explain with a story about a farmer?",
+    "इसे आसान भाषा में बताओ",
+    "इसका उदाहरण दो",
+    "फिर से समझाओ",
+])
+def test_follow_ups(question):
+    assert is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "Why do we need more trees?",
+    "What is this called in Hindi?",
+    "What is photosynthesis?",
+    "How do volcanoes erupt and why are they dangerous?",
+    "Which of these animals is a mammal: cow, hen or fish?",
+    "पेड़ क्यों ज़रूरी हैं?",
+    "",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question)
+
+
+@pytest.mark.parametrize("question,expected", [
+    ("Explain photosynthesis again", True),
+    ("What is this called in Hindi?", True),
+    ("Explain it again in simpler words", False),
+    ("Give another example please", False),
+    ("इसे आसान भाषा में समझाओ", False),
+])
+def test_has_own_topic(question, expected):
+    assert has_own_topic(question) is expected
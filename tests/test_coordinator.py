@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from coordinator import BackpressureError, FlightCancelled, RequestCoordinator, TokenBucket
+
+
+def unlimited():
+    return TokenBucket(rate=1000, burst=1000)
+
+
+def slow_producer(chunks, delay, calls):
+    def produce(stop):
+        calls.append(threading.current_thread().name)
+        for chunk in chunks:
+            if stop.wait(delay):
+                return
+            yield chunk
+    return produce
+
+
+def test_identical_requests_share_one_upstream_call():
+    coordinator = RequestCoordinator(unlimited())
+    calls = []
+    produce = slow_producer(["a", "b", "c"], 0.05, calls)
+    results = []
+
+    def subscriber():
+        results.append("".join(coordinator.stream("key", produce)))
+
+    threads = [threading.Thread(target=subscriber) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["abc"] * 5
+    assert len(calls) == 1
+    assert coordinator.stats["upstream"] == 1
+    assert coordinator.stats["coalesced"] == 4
+
+
+def test_late_joiner_replays_earlier_chunks():
+    coordinator = RequestCoordinator(unlimited())
+    calls = []
+    produce = slow_producer(["a", "b", "c"], 0.05, calls)
+    first = coordinator.stream("key", produce)
+    assert next(first) == "a"
+
+    assert "".join(coordinator.stream("key", produce)) == "abc"
+    assert "".join(first) == "bc"
+    assert len(calls) == 1
+
+
+def test_different_keys_are_not_coalesced():
+    coordinator = RequestCoordinator(unlimited())
+    calls = []
+    produce = slow_producer(["x"], 0, calls)
+    assert "".join(coordinator.stream("one", produce)) == "x"
+    assert "".join(coordinator.stream("two", produce)) == "x"
+    assert len(calls) == 2
+
+
+def test_error_reaches_every_subscriber():
+    coordinator = RequestCoordinator(unlimited())
+
+    def produce(stop):
+        yield "a"
+        raise ValueError("upstream broke")
+
+    with pytest.raises(ValueError):
+        "".join(coordinator.stream("key", produce))
+
+
+def test_last_subscriber_leaving_stops_the_producer():
+    coordinator = RequestCoordinator(unlimited())
+    stopped = threading.Event()
+
+    def produce(stop):
+        yield "a"
+        stop.wait(5)
+        stopped.set()
+        yield "never published"
+
+    stream = coordinator.stream("key", produce)
+    assert next(stream) == "a"
+    stream.close()
+    assert stopped.wait(2)
+
+
+def test_request_after_cancel_starts_a_fresh_flight():
+    coordinator = RequestCoordinator(unlimited())
+    calls = []
+    produce = slow_producer(["a", "b", "c"], 0.2, calls)
+    cancel = threading.Event()
+    cancel.set()
+    assert "".join(coordinator.stream("key", produce, cancel)) == ""
+
+    time.sleep(0.1)  # The first producer is still sleeping and has not noticed the stop yet
+    assert "".join(coordinator.stream("key", produce)) == "abc"
+    assert len(calls) == 2
+
+
+def test_cancelled_flight_ends_with_an_error():
+    coordinator = RequestCoordinator(unlimited())
+    stream = coordinator.stream("key", slow_producer(["a", "b", "c"], 0.1, []))
+    assert next(stream) == "a"
+    flight = coordinator._flights["key"]
+    stream.close()
+
+    assert "key" not in coordinator._flights
+    with flight.cond:
+        assert flight.cond.wait_for(lambda: flight.done, 2)
+    assert isinstance(flight.error, FlightCancelled)
+    assert flight.chunks == ["a"]
+
+
+def test_cancelled_while_rate_limited_never_calls_producer():
+    coordinator = RequestCoordinator(TokenBucket(rate=2, burst=1, max_wait=5))
+    calls = []
+    produce = slow_producer(["x"], 0, calls)
+    assert "".join(coordinator.stream("first", produce)) == "x"
+
+    cancel = threading.Event()
+    cancel.set()
+    assert "".join(coordinator.stream("second", produce, cancel)) == ""
+    time.sleep(0.7)  # Longer than the limiter wait
+    assert len(calls) == 1
+
+
+def test_backpressure_is_raised_and_counted():
+    coordinator = RequestCoordinator(TokenBucket(rate=0.01, burst=1, max_wait=1))
+    produce = slow_producer(["x"], 0, [])
+    assert "".join(coordinator.stream("first", produce)) == "x"
+    with pytest.raises(BackpressureError):
+        "".join(coordinator.stream("second", produce))
+    assert coordinator.stats["rejected"] == 1
@@ -0,0 +1,87 @@
+import pytest
+
+from preprocess import HINDI, answer_language, detect_script, local_reply, preprocess
+
+OPTIONS = ["Four", "Eight", "Six", "Ten"]
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("hello!", "greeting"),
+    ("Namaste ji", "greeting"),
+    ("नमस्ते", "greeting"),
+    ("thank you so much", "thanks"),
+    ("धन्यवाद", "thanks"),
+    ("yes please", "yes"),
+    ("हां", "yes"),
+    ("no thanks", "no"),
+    ("नहीं", "no"),
+    ("", "empty"),
+    ("👍", "empty"),
+    ("?!", "empty"),
+    ("What is photosynthesis?", "question"),
+    ("प्रकाश संश्लेषण क्या है?", "question"),
+    ("hi, why is the sky blue?", "question"),
+])
+def test_intents(text, intent):
+    assert preprocess(text).intent == intent
+
+
+@pytest.mark.parametrize("text, choice", [("b", "b"), ("(c)", "c"), ("Option a", "a"), ("D.", "d"), ("उत्तर b", "b")])
+def test_bare_quiz_answers(text, choice):
+    query = preprocess(text)
+    assert (query.intent, query.choice) == ("quiz_answer", choice)
+
+
+@pytest.mark.parametrize("text, choice", [
+    ("c) Six", "c"),
+    ("b. Eight", "b"),
+    ("option b is correct", "b"),
+    ("(a) four", "a"),
+    ("Ten", "d"),
+    ("six!", "c"),
+])
+def test_quiz_answers_with_option_text(text, choice):
+    query = preprocess(text, OPTIONS)
+    assert (query.intent, query.choice) == ("quiz_answer", choice)
+
+
+def test_option_text_is_a_question_without_a_running_quiz():
+    assert preprocess("c) Six").intent == "question"
+    assert preprocess("a plant needs sunlight, why?", OPTIONS).intent == "question"
+
+
+def test_text_is_normalized():
+    assert preprocess("  What​ is   light? ").text == "What is light?"
+
+
+@pytest.mark.parametrize("text, script", [
+    ("What is light?", "latin"),
+    ("प्रकाश क्या है?", "devanagari"),
+    ("photosynthesis क्या है", "mixed"),
+    ("42", "none"),
+])
+def test_detect_script(text, script):
+    assert detect_script(text) == script
+
+
+@pytest.mark.parametrize("text, language", [
+    ("What is photosynthesis?", "en"),
+    ("प्रकाश संश्लेषण क्या है?", "hi"),
+    ("photosynthesis kya hai aur kaise hota hai", "hinglish"),
+    ("Is it a kind of mineral?", "en"),
+])
+def test_language(text, language):
+    assert preprocess(text).language == language
+
+
+def test_answer_language_follows_the_input_script():
+    assert answer_language(preprocess("प्रकाश क्या है?"), "English") == HINDI
+    assert answer_language(preprocess("mujhe gravity samjhao"), "English") == HINDI
+    assert answer_language(preprocess("What is light?"), "English") == "English"
+    assert answer_language(preprocess("What is light?"), HINDI) == HINDI
+
+
+def test_local_reply_language_and_fallback():
+    assert local_reply("thanks", HINDI) == local_reply("thanks", "hi")
+    assert local_reply("thanks", "English") != local_reply("thanks", HINDI)
+    assert local_reply("quiz_answer", "English") == local_reply("empty", "English")
@@ -0,0 +1,128 @@
+import pytest
+
+from chat_history import Message
+from conversation import ConversationContext
+from progress_store import PAGE_SIZE, MemoryBackend, ProgressStore, SQLiteBackend
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "progress.sqlite3")) if request.param == "sqlite" else MemoryBackend()
+    return ProgressStore(backend, flush_interval=0.01)
+
+
+class CountingBackend:
+    """Wraps a backend and counts page reads."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.reads = 0
+
+    def messages(self, session_id, start, count):
+        self.reads += 1
+        return self.backend.messages(session_id, start, count)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def fill(store, session_id, count):
+    store.save_session(session_id, "student", "English", "Science", 6)
+    history = store.history(session_id)
+    for i in range(count):
+        history.append(Message("user" if i % 2 == 0 else "assistant", f"message {i}"))
+    store.flush()
+    return history
+
+
+def test_session_round_trip(store):
+    fill(store, "s1", 3)
+    restored = store.load_session("s1")
+    assert restored["messages"] == 3
+    assert (restored["student"], restored["language"], restored["subject"], restored["grade"]) == \
+        ("student", "English", "Science", 6)
+    assert store.load_session("missing") is None
+    assert store.load_session(None) is None
+
+
+def test_restored_history_reads_lazily(store):
+    fill(store, "s1", PAGE_SIZE * 3 + 5)
+    store.backend = counting = CountingBackend(store.backend)
+    history = store.history("s1", store.load_session("s1")["messages"])
+
+    assert len(history) == PAGE_SIZE * 3 + 5
+    assert counting.reads == 0
+    assert history[-1].content == f"message {PAGE_SIZE * 3 + 4}"
+    assert history[-2].content == f"message {PAGE_SIZE * 3 + 3}"
+    assert counting.reads == 1
+    assert [message.content for message in history[:2]] == ["message 0", "message 1"]
+    assert counting.reads == 2
+
+
+def test_append_after_restore_continues_numbering(store):
+    fill(store, "s1", 3)
+    history = store.history("s1", store.load_session("s1")["messages"])
+    history.append(Message("user", "new"))
+    store.flush()
+    stored = store.history("s1", store.load_session("s1")["messages"])
+    assert [message.content for message in stored] == ["message 0", "message 1", "message 2", "new"]
+
+
+def test_restore_inside_the_flush_window_keeps_queued_messages(tmp_path):
+    store = ProgressStore(SQLiteBackend(str(tmp_path / "progress.sqlite3")), flush_interval=1.0)
+    store.save_session("s1", "student", "English", "Science", 6)
+    first = store.history("s1")
+    for i in range(3):
+        first.append(Message("user", f"message {i}"))
+    second = store.history("s1", store.load_session("s1")["messages"])
+    second.append(Message("user", "after restore"))
+    store.flush()
+    assert [message.content for message in store.history("s1", store.load_session("s1")["messages"])] == \
+        ["message 0", "message 1", "message 2", "after restore"]
+
+
+def test_two_tabs_on_one_session_do_not_overwrite_each_other(store):
+    fill(store, "s1", 2)
+    count = store.load_session("s1")["messages"]
+    tab_a, tab_b = store.history("s1", count), store.history("s1", count)
+    tab_a.append(Message("user", "from a"))
+    tab_b.append(Message("user", "from b"))
+    store.flush()
+    stored = store.history("s1", store.load_session("s1")["messages"])
+    assert sorted(message.content for message in stored[2:]) == ["from a", "from b"]
+    assert len(stored) == 4
+
+
+def test_quiz_attempt_is_scored_from_its_answers(store):
+    store.start_attempt("a1", "s1", "student", "Science", 6, "en", "topic", 3)
+    store.record_answer("a1", 0, 11, "a", True)
+    store.record_answer("a1", 1, 12, "b", False)
+    store.record_answer("a1", 2, 13, "c", True)
+    store.finish_attempt("a1", 66.7)
+    store.start_attempt("a2", "s1", "student", "Science", 6, "en", "topic", 3)  # Never finished
+    store.flush()
+
+    attempts = store.attempts(student="student")
+    assert len(attempts) == 1
+    assert (attempts[0]["id"], attempts[0]["correct"], attempts[0]["score"]) == ("a1", 2, 66.7)
+    assert store.attempts(topic="other") == []
+
+
+def test_stats_count_batched_writes(store):
+    fill(store, "s1", 10)
+    stats = store.stats()
+    assert stats["writes"] == 11
+    assert stats["queued"] == 0
+    assert stats["batches"] >= 1
+
+
+def test_restored_conversation_does_not_read_old_pages(store):
+    fill(store, "s1", 1000)
+    store.backend = counting = CountingBackend(store.backend)
+    count = store.load_session("s1")["messages"]
+    history = store.history("s1", count)
+    context = ConversationContext(folded=max(0, count - PAGE_SIZE))
+
+    messages = context.messages(history)
+    assert messages[-1]["content"] == "message 999"
+    assert counting.reads <= 2
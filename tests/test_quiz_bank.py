@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from quiz_bank import QuizBank
+
+FACTS = [
+    ("Which gas do plants release during photosynthesis?", ["Oxygen", "Helium", "Argon", "Neon"]),
+    ("How many legs does an insect have?", ["Six", "Eight", "Four", "Ten"]),
+    ("What is the boiling point of water at sea level?", ["100 °C", "50 °C", "0 °C", "212 °C"]),
+    ("Which planet is known as the red planet?", ["Mars", "Venus", "Jupiter", "Saturn"]),
+    ("Who wrote the national anthem of India?", ["Tagore", "Gandhi", "Nehru", "Bose"]),
+    ("Which organ pumps blood around the body?", ["Heart", "Liver", "Lungs", "Kidney"]),
+    ("What do bees collect from flowers?", ["Nectar", "Sand", "Water", "Leaves"]),
+    ("Which is the longest river in the world?", ["Nile", "Ganga", "Amazon", "Yamuna"]),
+    ("What shape has exactly three sides?", ["Triangle", "Square", "Circle", "Hexagon"]),
+]
+
+
+def quiz_question(index, answer="a"):
+    question, options = FACTS[index]
+    return {"question": question, "options": options, "answer": answer}
+
+
+@pytest.fixture
+def bank(tmp_path):
+    return QuizBank(str(tmp_path / "quiz_bank.sqlite3"))
+
+
+def test_near_duplicate_in_same_slot_is_stored_once(bank):
+    first = bank.add_questions([quiz_question(0)], "Science", 6, "English", "photosynthesis")
+    reworded = {"question": "Which gas do plants release in photosynthesis?",
+                "options": ["Oxygen", "Helium", "Argon", "Neon"], "answer": "a"}
+    second = bank.add_questions([reworded], "Science", 6, "English", "photosynthesis")
+
+    assert first == second
+    assert bank.count("Science", 6, "English", "photosynthesis") == 1
+
+
+def test_duplicate_from_another_topic_counts_towards_this_slot(bank):
+    [question_id] = bank.add_questions([quiz_question(0)], "Science", 6, "English", "photosynthesis")
+    assert bank.add_questions([quiz_question(0)], "Science", 6, "English", "plants") == [question_id]
+
+    assert bank.count("Science", 6, "English", "plants") == 1
+    assert bank.count("Science", 6, "English", "photosynthesis") == 1
+    assert [q["id"] for q in bank.build_quiz("Science", 6, "English", "plants")] == [question_id]
+
+
+def test_slot_fills_even_when_every_question_is_a_duplicate(bank):
+    questions = [quiz_question(index) for index in range(5)]
+    bank.add_questions(questions, "Science", 6, "English", "general")
+    bank.add_questions(questions, "Science", 6, "English", "revision")
+
+    assert bank.count("Science", 6, "English", "revision") == 5
+
+
+def test_other_grades_and_languages_are_not_duplicates(bank):
+    [english] = bank.add_questions([quiz_question(0)], "Science", 6, "English", "photosynthesis")
+    [hindi] = bank.add_questions([quiz_question(0)], "Science", 6, "हिंदी (Hindi)", "photosynthesis")
+    [older] = bank.add_questions([quiz_question(0)], "Science", 7, "English", "photosynthesis")
+
+    assert len({english, hindi, older}) == 3
+
+
+def test_questions_without_answer_or_options_are_skipped(bank):
+    unanswered = dict(quiz_question(0), answer=None)
+    one_option = dict(quiz_question(1), options=["Six"])
+
+    assert bank.add_questions([unanswered, one_option], "Science", 6, "English", "t") == [None, None]
+    assert bank.count("Science", 6, "English", "t") == 0
+
+
+def test_build_quiz_mixes_difficulties(bank):
+    ids = bank.add_questions([quiz_question(index) for index in range(9)], "Science", 6, "English", "t")
+    easy, medium, hard = ids[:3], ids[3:6], ids[6:]
+    for question_id in easy:
+        for _ in range(8):
+            bank.record_outcome(question_id, True)
+    for question_id in hard:
+        for _ in range(8):
+            bank.record_outcome(question_id, False)
+
+    for _ in range(5):
+        picked = {q["id"] for q in bank.build_quiz("Science", 6, "English", "t", size=3)}
+        assert len(picked & set(easy)) == len(picked & set(medium)) == len(picked & set(hard)) == 1
+
+
+def test_build_quiz_prefers_less_tried_questions(bank):
+    ids = bank.add_questions([quiz_question(index) for index in range(4)], "Science", 6, "English", "t")
+    for question_id in ids[:2]:
+        bank.record_outcome(question_id, True)
+        bank.record_outcome(question_id, False)
+
+    picked = {q["id"] for q in bank.build_quiz("Science", 6, "English", "t", size=2)}
+    assert picked == set(ids[2:])
+
+
+def test_bank_from_before_slot_table_keeps_its_questions(tmp_path):
+    path = str(tmp_path / "quiz_bank.sqlite3")
+    QuizBank(path).add_questions([quiz_question(0), quiz_question(1)], "Science", 6, "English", "t")
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE slot_questions")
+    conn.commit()
+    conn.close()
+
+    assert QuizBank(path).count("Science", 6, "English", "t") == 2
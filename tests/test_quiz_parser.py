@@ -0,0 +1,147 @@
+import pytest
+
+from quiz_parser import QuizStreamParser, parse_quiz_response, strip_quiz
+
+# (name, response text, expected [(question, options count, answer), ...])
+CORPUS = [
+    ("english_prompt_format", """Photosynthesis is how plants make food! 🌱
+
+**Quiz**
+Q1. What do plants need for photosynthesis?
+a) Sunlight
+b) Darkness
+c) Sand
+d) Plastic
+Answer: a
+
+Q2. Which gas do plants release?
+a) Carbon dioxide
+b) Oxygen
+c) Nitrogen
+d) Helium
+Answer: b
+""", [("What do plants need for photosynthesis?", 4, "a"),
+      ("Which gas do plants release?", 4, "b")]),
+    ("markdown_and_question_word", """1. Explanation: plants use sunlight.
+2. Video: https://www.youtube.com/watch?v=example
+
+**Question 1:** Where does photosynthesis happen?
+- A. Roots
+- B. Leaves
+- C. Flowers
+- D. Seeds
+**Answer: B**
+""", [("Where does photosynthesis happen?", 4, "b")]),
+    ("hindi_numbering", """प्रश्न 1: पौधे भोजन कहाँ बनाते हैं?
+क) जड़
+ख) पत्ती
+ग) फूल
+घ) बीज
+उत्तर: ख
+
+प्र.२। पौधे कौन सी गैस छोड़ते हैं?
+(a) ऑक्सीजन
+(b) नाइट्रोजन
+(c) हीलियम
+(d) आर्गन
+सही उत्तर: (a)
+""", [("पौधे भोजन कहाँ बनाते हैं?", 4, "b"),
+      ("पौधे कौन सी गैस छोड़ते हैं?", 4, "a")]),
+    ("header_on_own_line_and_inline_correct", """Q1.
+What colour is chlorophyll?
+a) Red
+b) Green (correct)
+c) Blue
+d) Yellow
+Q2: How many legs does an insect have?
+a: 4
+b: 6
+c: 8
+d: 10
+Ans. b
+""", [("What colour is chlorophyll?", 4, "b"),
+      ("How many legs does an insect have?", 4, "b")]),
+    ("truncated_last_question", """Q1. What is 2 + 2?
+a) 3
+b) 4
+c) 5
+d) 6
+Answer: b
+Q2. What is 3 + 3?
+a) 5
+b) 6
+""", [("What is 2 + 2?", 4, "b"), ("What is 3 + 3?", 2, None)]),
+    ("numbered_options", """Q1. Which is a prime?
+1) 4
+2) 6
+3) 7
+4) 9
+Answer: 3
+
+प्रश्न 2: कौन सा सम है?
+१) 3
+२) 5
+३) 8
+४) 9
+उत्तर: ३
+""", [("Which is a prime?", 4, "c"), ("कौन सा सम है?", 4, "c")]),
+    ("numbered_questions_with_lettered_options", """1. What is 2 + 2?
+a) 3
+b) 4 (correct)
+2. What is 3 + 3?
+a) 6 ✅
+b) 7
+3. What is 4 + 4?
+a) 7
+b) 8
+Answer: b
+""", [("What is 2 + 2?", 2, "b"), ("What is 3 + 3?", 2, "a"), ("What is 4 + 4?", 2, "b")]),
+]
+
+
+def _summarize(questions):
+    return [(q["question"], len(q["options"]), q["answer"]) for q in questions]
+
+
+@pytest.mark.parametrize("name,text,expected", CORPUS, ids=[case[0] for case in CORPUS])
+def test_corpus_whole(name, text, expected):
+    assert _summarize(parse_quiz_response(text)) == expected
+
+
+@pytest.mark.parametrize("name,text,expected", CORPUS, ids=[case[0] for case in CORPUS])
+def test_corpus_chunked(name, text, expected):
+    parser = QuizStreamParser()
+    for i in range(0, len(text), 7):  # Odd chunk size splits lines mid-way
+        parser.feed(text[i:i + 7])
+    parser.close()
+    assert _summarize(parser.questions) == expected
+
+
+def test_numbered_list_is_not_read_as_options():
+    text = "Q1. Name the steps.\n2. Water\n3. Light\n"
+    assert _summarize(parse_quiz_response(text)) == []
+
+
+def test_max_questions_stops_parsing():
+    text = CORPUS[0][1]
+    assert len(parse_quiz_response(text, max_questions=1)) == 1
+
+
+def test_strip_quiz_cuts_the_quiz_and_its_heading():
+    assert strip_quiz(CORPUS[0][1]) == "Photosynthesis is how plants make food! 🌱"
+
+
+def test_strip_quiz_keeps_numbered_explanation():
+    text = CORPUS[1][1]
+    assert strip_quiz(text) == ("1. Explanation: plants use sunlight.\n"
+                                "2. Video: https://www.youtube.com/watch?v=example")
+
+
+def test_strip_quiz_with_numbered_options():
+    text = "Primes have two factors.\n1. 2 is prime\n2. 3 is prime\n\nQuiz\n" + CORPUS[5][1]
+    assert strip_quiz(text) == "Primes have two factors.\n1. 2 is prime\n2. 3 is prime"
+
+
+def test_strip_quiz_without_quiz_is_unchanged():
+    text = "Plants make food.\n1. Light\n2. Water"
+    assert strip_quiz(text) == text
@@ -0,0 +1,78 @@
+import pytest
+
+import response_cache
+from response_cache import LRUCache, ResponseCache, SQLiteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock.time)
+    return clock
+
+
+def test_memory_entries_expire(clock):
+    memory = LRUCache(ttl=60)
+    memory.set("k", "v")
+    clock.now += 59
+    assert memory.get("k") == "v"
+    clock.now += 2
+    assert memory.get("k") is None
+    assert len(memory) == 0
+
+
+def test_memory_ttl_per_entry(clock):
+    memory = LRUCache(ttl=60)
+    memory.set("short", "v", ttl=5)
+    memory.set("pinned", "v", ttl=0)
+    clock.now += 10
+    assert memory.get("short") is None
+    clock.now += 10 ** 9
+    assert memory.get("pinned") == "v"
+
+
+def test_memory_evicts_least_recently_used():
+    memory = LRUCache(maxsize=2)
+    memory.set("a", 1)
+    memory.set("b", 2)
+    memory.get("a")
+    memory.set("c", 3)
+    assert memory.get("b") is None
+    assert memory.get("a") == 1
+
+
+def test_promoted_entry_expires_with_disk_copy(clock, tmp_path):
+    disk = SQLiteCache(path=str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache = ResponseCache(LRUCache(ttl=3600), disk)
+    disk.set("k", "v", ttl=30)
+
+    assert cache.get("k") == "v"
+    assert cache.stats()["disk_hits"] == 1
+    clock.now += 10
+    assert cache.get("k") == "v"
+    assert cache.stats()["memory_hits"] == 1
+    clock.now += 25
+    assert cache.get("k") is None
+
+
+def test_pinned_entries_never_expire_in_either_tier(clock, tmp_path):
+    disk = SQLiteCache(path=str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache = ResponseCache(LRUCache(ttl=60), disk)
+    cache.set("k", "v", ttl=0)
+    clock.now += 10 ** 9
+    assert cache.get("k") == "v"
+    assert cache.stats()["memory_hits"] == 1
+
+    fresh = ResponseCache(LRUCache(ttl=60), disk)
+    assert fresh.get("k") == "v"  # Promoted from disk still pinned
+    clock.now += 10 ** 9
+    assert fresh.get("k") == "v"
+    assert fresh.stats()["memory_hits"] == 1
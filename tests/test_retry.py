@@ -0,0 +1,171 @@
+import time
+
+import pytest
+import requests
+
+import retry
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, retry_after_seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error", response=self)
+
+    def close(self):
+        self.closed = True
+
+
+def sender(*outcomes):
+    """send() that returns or raises each outcome in turn and records the remaining time it was given."""
+    outcomes = list(outcomes)
+    calls = []
+
+    def send(remaining):
+        calls.append(remaining)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    send.calls = calls
+    return send
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    return slept
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # The trial is still running
+
+
+def test_failed_trial_reopens_and_successful_trial_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_unexpected_error_in_trial_releases_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        call_with_retry(sender(requests.exceptions.ChunkedEncodingError("cut off")), RetryPolicy(), breaker)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert call_with_retry(sender(FakeResponse(200)), RetryPolicy(), breaker).status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_refuses_without_calling():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    send = sender(FakeResponse(200))
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(send, RetryPolicy(), breaker)
+    assert send.calls == []
+
+
+def test_retryable_status_is_retried(no_sleep):
+    first = FakeResponse(503)
+    send = sender(first, FakeResponse(200))
+    assert call_with_retry(send, RetryPolicy(max_attempts=3)).status_code == 200
+    assert len(send.calls) == 2
+    assert first.closed
+
+
+def test_client_error_is_not_retried_and_does_not_trip_the_breaker(no_sleep):
+    breaker = CircuitBreaker(failure_threshold=1)
+    send = sender(FakeResponse(400), FakeResponse(200))
+    with pytest.raises(requests.exceptions.HTTPError):
+        call_with_retry(send, RetryPolicy(), breaker)
+    assert len(send.calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_last_error_is_raised_after_max_attempts(no_sleep):
+    send = sender(*[requests.exceptions.ConnectionError("refused")] * 3)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        call_with_retry(send, RetryPolicy(max_attempts=3))
+    assert len(send.calls) == 3
+    assert len(no_sleep) == 2
+
+
+def test_dns_failure_is_not_retried(no_sleep):
+    send = sender(requests.exceptions.ConnectionError("NameResolutionError: no such host"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        call_with_retry(send, RetryPolicy(max_attempts=3))
+    assert len(send.calls) == 1
+
+
+def test_retry_after_header_sets_the_delay(no_sleep):
+    send = sender(FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200))
+    call_with_retry(send, RetryPolicy(deadline=30))
+    assert no_sleep == [2.0]
+
+
+def test_retry_after_past_the_deadline_gives_up(no_sleep):
+    send = sender(FakeResponse(429, {"Retry-After": "60"}), FakeResponse(200))
+    with pytest.raises(requests.exceptions.HTTPError):
+        call_with_retry(send, RetryPolicy(deadline=10))
+    assert len(send.calls) == 1
+    assert no_sleep == []
+
+
+def test_send_gets_the_remaining_deadline(no_sleep):
+    send = sender(requests.exceptions.Timeout("slow"), FakeResponse(200))
+    call_with_retry(send, RetryPolicy(deadline=5))
+    assert all(0 < remaining <= 5 for remaining in send.calls)
+
+
+def test_retry_after_parses_seconds_and_dates():
+    assert retry_after_seconds(FakeResponse(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after_seconds(FakeResponse(429)) is None
+    future = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert 25 <= retry_after_seconds(FakeResponse(429, {"Retry-After": future})) <= 30
+    past = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() - 30))
+    assert retry_after_seconds(FakeResponse(429, {"Retry-After": past})) == 0.0
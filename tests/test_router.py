@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from coordinator import BackpressureError
+from router import AllModelsFailed, ModelRouter
+
+
+def make_router(hedge_after=0.2, max_workers=8):
+    return ModelRouter(policy=[{"models": ["default"]}], fallback_models=[],
+                       hedge_after=hedge_after, max_workers=max_workers)
+
+
+def fake_models(behaviour, calls, stops):
+    """start() whose models answer from `behaviour`: {model: (delay, chunks) or an exception}."""
+    def start(model, stop):
+        calls.append(model)
+        stops[model] = stop
+        outcome = behaviour[model]
+        if isinstance(outcome, Exception):
+            raise outcome
+        delay, chunks = outcome
+        if stop.wait(delay):
+            return
+        for chunk in chunks:
+            if stop.is_set():
+                return
+            yield chunk
+    return start
+
+
+def test_first_model_answers_alone():
+    router = make_router()
+    calls, stops = [], {}
+    start = fake_models({"a": (0, ["x", "y"]), "b": (0, ["z"])}, calls, stops)
+
+    assert list(router.stream(["a", "b"], start)) == [("a", "x"), ("a", "y")]
+    assert calls == ["a"]
+    assert router.stats()["a"]["calls"] == 1
+
+
+def test_error_before_first_chunk_falls_back():
+    router = make_router()
+    calls, stops = [], {}
+    start = fake_models({"a": ConnectionError("down"), "b": (0, ["z"])}, calls, stops)
+
+    assert list(router.stream(["a", "b"], start)) == [("b", "z")]
+    assert calls == ["a", "b"]
+    assert router.stats()["a"]["error_rate"] == 1.0
+
+
+def test_stalling_model_is_hedged_and_loser_stopped():
+    router = make_router(hedge_after=0.1)
+    calls, stops = [], {}
+    start = fake_models({"a": (5, ["late"]), "b": (0, ["fast"])}, calls, stops)
+
+    began = time.monotonic()
+    assert list(router.stream(["a", "b"], start)) == [("b", "fast")]
+    assert time.monotonic() - began < 2
+    assert calls == ["a", "b"]
+    assert stops["a"].is_set()
+    # The loser's stall still counts towards its latency
+    assert router.stats()["a"]["calls"] == 1
+
+
+def test_only_the_winner_is_streamed():
+    router = make_router(hedge_after=0.05)
+    calls, stops = [], {}
+    start = fake_models({"a": (0.3, ["a1", "a2"]), "b": (0.1, ["b1", "b2"])}, calls, stops)
+
+    assert list(router.stream(["a", "b"], start)) == [("b", "b1"), ("b", "b2")]
+    assert stops["a"].is_set()
+
+
+def test_hedge_is_timed_from_when_the_attempt_starts():
+    router = make_router(hedge_after=0.1, max_workers=1)
+    busy = threading.Event()
+    router._executor.submit(busy.wait, 0.3)  # Every thread is taken; the attempt queues behind it
+    calls, stops = [], {}
+    start = fake_models({"a": (0.05, ["x"]), "b": (0, ["z"])}, calls, stops)
+
+    assert list(router.stream(["a", "b"], start)) == [("a", "x")]
+    assert calls == ["a"]
+    # Time spent queued for a thread is not the model's latency
+    assert router.stats()["a"]["p95"] < 0.2
+
+
+def test_all_models_failing_raises():
+    router = make_router()
+    calls, stops = [], {}
+    start = fake_models({"a": ConnectionError("down"), "b": TimeoutError("slow")}, calls, stops)
+
+    with pytest.raises(AllModelsFailed) as raised:
+        list(router.stream(["a", "b"], start))
+    assert [model for model, _ in raised.value.errors] == ["a", "b"]
+
+
+def test_backpressure_is_not_retried_on_other_models():
+    router = make_router()
+    calls, stops = [], {}
+    start = fake_models({"a": BackpressureError("busy"), "b": (0, ["z"])}, calls, stops)
+
+    with pytest.raises(BackpressureError):
+        list(router.stream(["a", "b"], start))
+    assert calls == ["a"]
+
+
+def test_error_after_first_chunk_is_raised():
+    router = make_router()
+
+    def start(model, stop):
+        yield "x"
+        raise ConnectionError("dropped")
+
+    stream = router.stream(["a", "b"], start)
+    assert next(stream) == ("a", "x")
+    with pytest.raises(ConnectionError):
+        next(stream)
+
+
+def test_cancel_stops_every_attempt():
+    router = make_router()
+    calls, stops = [], {}
+    start = fake_models({"a": (5, ["x"])}, calls, stops)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+
+    assert list(router.stream(["a"], start, cancel_event=cancel)) == []
+    assert stops["a"].is_set()